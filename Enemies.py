@@ -3,6 +3,7 @@ import math
 import random
 
 TILE_SIZE = 5
+SPAWN_CLEARANCE = 5  # Tiles kept free of other entities around a Sparc spawn
 
 class Sparc():
     def __init__(self, field, speed=3, size=5):
@@ -18,6 +19,7 @@ class Sparc():
         self.tile_x, self.tile_y = self.get_random_border_position()
         self.set_initial_direction()
         self.position = self.calculate_pixel_position()
+        field.place(self, self.tile_x, self.tile_y)
         
         # Movement state
         self.sub_pos = 0.0  # Sub-tile position (0.0-1.0)
@@ -44,12 +46,9 @@ class Sparc():
             
         self.last_update_time = current_time
         
-        # Your existing direction finding logic
-        valid_dirs = []
-        for dir_idx, (dir_dx, dir_dy) in enumerate(self.directions):
-            check_x, check_y = self.tile_x + dir_dx, self.tile_y + dir_dy
-            if self.is_on_border(check_x, check_y):
-                valid_dirs.append(dir_idx)
+        # Border neighbours come from the field's adjacency mask
+        mask = self.field.border_adjacency[self.tile_y * self.field.width + self.tile_x]
+        valid_dirs = [dir_idx for dir_idx in range(4) if mask & (1 << dir_idx)]
         
         if valid_dirs:
             if len(valid_dirs) > 1 and (self.current_dir + 2) % 4 in valid_dirs:
@@ -63,6 +62,16 @@ class Sparc():
         self.update_position()
         self.update_next_tile()
 
+    def get_state(self):
+        """Immutable snapshot of the Sparc for rewinding"""
+        return (self.tile_x, self.tile_y, self.current_dir, self.sub_pos)
+
+    def set_state(self, state):
+        """Restore a snapshot taken by get_state()"""
+        self.tile_x, self.tile_y, self.current_dir, self.sub_pos = state
+        self.update_position()
+        self.update_next_tile()
+
     def reverse_direction(self):
         """Simpler reverse that just flips direction"""
         self.current_dir = (self.current_dir + 2) % 4
@@ -89,21 +98,13 @@ class Sparc():
         self.next_tile_x = self.tile_x + dx
         self.next_tile_y = self.tile_y + dy
 
-    def get_random_border_position(self):
-        """Return random (x,y) tile coordinates on original border"""
-        border_positions = []
-        
-        # Top and bottom borders
-        for x in range(self.field.width):
-            border_positions.append((x, 0))  # Top
-            border_positions.append((x, self.field.height-1))  # Bottom
-            
-        # Left and right borders (excluding corners)
-        for y in range(1, self.field.height-1):
-            border_positions.append((0, y))  # Left
-            border_positions.append((self.field.width-1, y))  # Right
-            
-        return random.choice(border_positions)
+    def get_random_border_position(self, clearance=SPAWN_CLEARANCE, max_attempts=20):
+        """Return random (x,y) tile coordinates from the field's spawn list, away from other entities"""
+        for _ in range(max_attempts):
+            x, y = random.choice(self.field.spawn_positions)
+            if not self.field.occupants_near(x, y, clearance):
+                return x, y
+        return random.choice(self.field.spawn_positions)  # Crowded field: spawn anyway
 
     def set_initial_direction(self):
         """Set initial movement direction based on spawn position"""
@@ -130,6 +131,7 @@ class Sparc():
             self.field.x + (self.tile_x + self.sub_pos * dx) * TILE_SIZE + TILE_SIZE//2,
             self.field.y + (self.tile_y + self.sub_pos * dy) * TILE_SIZE + TILE_SIZE//2
         )
+        self.field.place(self, self.tile_x, self.tile_y)
 
     def draw(self, surface):
         """Draw diamond shape with border type indication"""
@@ -161,21 +163,31 @@ class Qix():
         # Initialize position
         self.reset_to_uncaptured_area()
         self.position = self.calculate_pixel_position()
+        # Captures keep whichever pocket holds a Qix
+        field.qixes.append(self)
 
     def reset_to_uncaptured_area(self):
         """Teleport Qix to a random position in uncaptured area"""
         max_attempts = 100
+        open_tiles = self.field.open_tiles
         for _ in range(max_attempts):
-            x = random.randint(1, self.field.width-2)
-            y = random.randint(1, self.field.height-2)
+            if open_tiles:
+                # Compiled levels list their uncaptured tiles
+                index = random.choice(open_tiles)
+                x, y = index % self.field.width, index // self.field.width
+            else:
+                x = random.randint(1, self.field.width-2)
+                y = random.randint(1, self.field.height-2)
             if not self.field.is_captured(x, y) and not self.field.is_on_border(x, y):
                 self.tile_x = x
                 self.tile_y = y
+                self.field.place(self, x, y)
                 return
         
         # Fallback if no uncaptured area found (shouldn't happen in normal game)
         self.tile_x = random.randint(1, self.field.width-2)
         self.tile_y = random.randint(1, self.field.height-2)
+        self.field.place(self, self.tile_x, self.tile_y)
 
     def calculate_pixel_position(self):
         """Convert tile coordinates to pixel position (center point)"""
@@ -201,40 +213,95 @@ class Qix():
         # Check if current position became invalid (captured)
         if not self.is_position_valid(int(self.tile_x), int(self.tile_y)):
             self.reset_to_uncaptured_area()
-            self.direction = random.uniform(0, 2 * math.pi)  # New random direction
-            self.x_vel = math.cos(self.direction) * self.speed
-            self.y_vel = math.sin(self.direction) * self.speed
+            self.set_direction(random.uniform(0, 2 * math.pi))  # New random direction
             return
 
-        # Calculate new position
-        new_x = self.tile_x + self.x_vel / TILE_SIZE
-        new_y = self.tile_y + self.y_vel / TILE_SIZE
-
-        # If hitting a barrier, change direction
-        if not self.is_position_valid(int(new_x), int(new_y)):
-            self.direction = random.uniform(0, 2 * math.pi)
-            self.x_vel = math.cos(self.direction) * self.speed
-            self.y_vel = math.sin(self.direction) * self.speed
-        else:
-            # Apply movement
-            self.tile_x = new_x
-            self.tile_y = new_y
+        # Travel the whole step, bouncing off walls along the way
+        self.advance(self.speed / TILE_SIZE)
 
         # Small chance for random direction change
         if random.random() < 0.05:  # 5% chance per move
-            self.direction += random.uniform(-1, 1)  # More noticeable changes
-            self.direction %= 2 * math.pi
-            self.x_vel = math.cos(self.direction) * self.speed
-            self.y_vel = math.sin(self.direction) * self.speed
+            self.set_direction(self.direction + random.uniform(-1, 1))  # More noticeable changes
 
         self.update_position()
 
+    def get_state(self):
+        """Immutable snapshot of the Qix for rewinding"""
+        return (self.tile_x, self.tile_y, self.direction)
+
+    def set_state(self, state):
+        """Restore a snapshot taken by get_state()"""
+        self.tile_x, self.tile_y, direction = state
+        self.set_direction(direction)
+        self.update_position()
+
+    def set_direction(self, angle):
+        """Point the Qix along an angle (radians)"""
+        self.direction = angle % (2 * math.pi)
+        self.x_vel = math.cos(self.direction) * self.speed
+        self.y_vel = math.sin(self.direction) * self.speed
+
+    def advance(self, distance, max_bounces=8):
+        """
+        Move up to `distance` tiles using the field's clearance
+
+        Away from walls the Qix jumps as far as the local clearance allows
+        in one step. Next to a wall it moves at most one tile and checks the
+        target, and when blocked it reflects off the clearance gradient
+        instead of giving up the rest of the step.
+
+        Args:
+            distance (float): Tiles to travel this update
+            max_bounces (int): Wall contacts allowed before stopping
+        """
+        bounces = 0
+        while distance > 1e-6 and bounces <= max_bounces:
+            tile_x, tile_y = int(self.tile_x), int(self.tile_y)
+            dir_x, dir_y = math.cos(self.direction), math.sin(self.direction)
+            clearance = self.field.clearance_at(tile_x, tile_y)
+            if clearance > 1:
+                # Every tile within clearance - 1 of this one is uncaptured
+                step = min(distance, clearance - 1)
+                self.tile_x += dir_x * step
+                self.tile_y += dir_y * step
+                distance -= step
+                continue
+
+            step = min(distance, 1.0)
+            new_x = self.tile_x + dir_x * step
+            new_y = self.tile_y + dir_y * step
+            if self.is_position_valid(int(new_x), int(new_y)):
+                self.tile_x, self.tile_y = new_x, new_y
+                distance -= step
+            else:
+                self.bounce(tile_x, tile_y)
+                bounces += 1
+
+    def bounce(self, tile_x, tile_y):
+        """Reflect the direction off the wall next to a tile"""
+        grad_x, grad_y = self.field.clearance_gradient(tile_x, tile_y)
+        length = math.hypot(grad_x, grad_y)
+        if not length:
+            self.set_direction(random.uniform(0, 2 * math.pi))
+            return
+        normal_x, normal_y = grad_x / length, grad_y / length
+        dir_x, dir_y = math.cos(self.direction), math.sin(self.direction)
+        dot = dir_x * normal_x + dir_y * normal_y
+        if dot < 0:
+            dir_x -= 2 * dot * normal_x
+            dir_y -= 2 * dot * normal_y
+        else:
+            # Already heading away but still blocked (a corner): leave along the normal
+            dir_x, dir_y = normal_x, normal_y
+        self.set_direction(math.atan2(dir_y, dir_x) + random.uniform(-0.3, 0.3))
+
     def update_position(self):
         """Convert tile position to pixel position"""
         self.position = (
             self.field.x + self.tile_x * TILE_SIZE + TILE_SIZE//2,
             self.field.y + self.tile_y * TILE_SIZE + TILE_SIZE//2
         )
+        self.field.place(self, int(self.tile_x), int(self.tile_y))
 
     def draw(self, surface):
         """Draw Qix with pulsating effect"""
@@ -1,13 +1,66 @@
 import pygame
 import math
+from array import array
+from collections import deque
 from utils import *
 
 TILE_SIZE = 5  # Reduced from 10px to 5px for finer movement
 BORDER_WIDTH = 1  # Border remains 1 tile wide
 
+# Tile state codes used when the grid is serialized (network stream, replays)
+TILE_OPEN = 0
+TILE_CAPTURED = 1
+TILE_BORDER = 2
+TILE_WIRE = 3
+
+# Neighbour directions (right, down, left, up); bit i of a border adjacency
+# mask is set when the neighbour in DIRECTIONS[i] is a border tile
+DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+MAX_CLEARANCE = 255
+
+
+def distance_transform(width, height, open_tiles):
+    """
+    Chebyshev distance from each open tile to the nearest blocked tile
+
+    Two-pass chamfer transform; tiles outside the grid count as blocked.
+
+    Args:
+        width (int): Grid width in tiles
+        height (int): Grid height in tiles
+        open_tiles (bytearray): Non-zero for open tiles, row-major
+    """
+    dist = bytearray(MAX_CLEARANCE if is_open else 0 for is_open in open_tiles)
+    for y in range(height):
+        row = y * width
+        for x in range(width):
+            d = dist[row + x]
+            if not d:
+                continue
+            best = 0 if x == 0 or y == 0 or x == width - 1 else min(
+                dist[row + x - 1], dist[row - width + x - 1],
+                dist[row - width + x], dist[row - width + x + 1])
+            if best + 1 < d:
+                dist[row + x] = best + 1
+    for y in range(height - 1, -1, -1):
+        row = y * width
+        for x in range(width - 1, -1, -1):
+            d = dist[row + x]
+            if not d:
+                continue
+            best = 0 if x == 0 or y == height - 1 or x == width - 1 else min(
+                dist[row + x + 1], dist[row + width + x + 1],
+                dist[row + width + x], dist[row + width + x - 1])
+            if best + 1 < d:
+                dist[row + x] = best + 1
+    return dist
+
 class Field:
-    def __init__(self, x, y, width=160, height=120, color=(200, 200, 200), border_width=BORDER_WIDTH):
+    def __init__(self, x, y, width=160, height=120, color=(200, 200, 200), border_width=BORDER_WIDTH, level=None):
         # Double tile count to maintain similar play area size (160x120 tiles = 800x600 pixels)
+        if level is not None:  # Compiled levels carry their own size
+            width, height = level.width, level.height
         self.x = x
         self.y = y
         self.width = width  
@@ -31,11 +84,40 @@ class Field:
         self.perimeter = set()
         self.wires = []
         self.wire_coordinates = []
+        # Tiles whose state changed since the last end_tick()
+        self.tile_changes = set()
+        # Tiles whose derived layers (adjacency, clearance, region id) changed,
+        # and those of the tick that ended last (what History snapshots)
+        self.layer_changes = set()
+        self.last_layer_changes = set()
+        # Derived indexes (baked into compiled levels)
+        self.border_adjacency = bytearray(width * height)
+        self.spawn_positions = []
+        self.open_tiles = None  # Uncaptured tile indices, may be stale
+        self.level = level
+        # Player drawing the current trail, so two players never share one
+        self.wire_owner = None
+        # Optional callback(trail_length, tiles_captured) run after each capture
+        self.on_capture = None
+        # Connected components of the uncaptured area: region id per tile (0 if captured)
+        self.regions = array("I")
+        self.region_sizes = {}
+        self.next_region = 1
+        # Qixes register here; pockets holding one are never captured
+        self.qixes = []
+        # Occupancy layer: tile -> entities on it, and the tile each entity is indexed under
+        self.occupants = {}
+        self.entity_tiles = {}
         
-        # Create border tiles
-        self.create_border_tiles()
-        self.capture_edges()
-        self.update_perimeter()
+        if level is not None:
+            self.load_level(level)
+        else:
+            # Create border tiles
+            self.create_border_tiles()
+            self.capture_edges()
+            self.update_perimeter()
+            self.build_distance_field()
+            self.build_regions()
 
     def create_border_tiles(self):
         """Create 1-tile wide borders around the edges"""
@@ -62,18 +144,55 @@ class Field:
         for y in range(1, self.height - 1):
             self.tiles[y][x].is_border = True
             self.tiles[y][x].color = (0, 0, 0)
+        
+        # Sparcs spawn anywhere on the outer border
+        for x in range(self.width):
+            self.spawn_positions.append((x, 0))
+            self.spawn_positions.append((x, self.height - 1))
+        for y in range(1, self.height - 1):
+            self.spawn_positions.append((0, y))
+            self.spawn_positions.append((self.width - 1, y))
+        for x, y in self.spawn_positions:
+            self.link_border(x, y)
+
+    def load_level(self, level):
+        """Apply a compiled level instead of building the field procedurally"""
+        width = self.width
+        for index, code in enumerate(level.grid):
+            if code:
+                tile = self.tiles[index // width][index % width]
+                if code == TILE_BORDER:
+                    tile.captured = True
+                    tile.is_border = True
+                    tile.color = (0, 0, 0)
+                else:
+                    tile.capture()
+        self.border_adjacency[:] = level.adjacency
+        self.perimeter = {(i % width, i // width) for i in level.perimeter}
+        self.spawn_positions = [(i % width, i // width) for i in level.spawns]
+        self.open_tiles = level.uncaptured
+        self.clearance = bytearray(level.clearance)
+        self.regions = array("I")
+        self.regions.frombytes(level.regions.tobytes())  # Writable copy of the mapped ids
+        self.region_sizes = dict(enumerate(level.region_sizes, 1))
+        self.next_region = len(self.region_sizes) + 1
+
+    def link_border(self, x, y):
+        """Record a tile that just became border in the adjacency masks"""
+        for bit, (dx, dy) in enumerate(DIRECTIONS):
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < self.width and 0 <= ny < self.height and
+                self.tiles[ny][nx].is_border):
+                self.border_adjacency[y * self.width + x] |= 1 << bit
+                self.border_adjacency[ny * self.width + nx] |= 1 << ((bit + 2) % 4)
+                self.layer_changes.add((x, y))
+                self.layer_changes.add((nx, ny))
 
     def capture_edges(self):
         """Capture the edges of the field (border tiles)"""
-        border_count = 0
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.tiles[y][x].is_border:
-                    self.tiles[y][x].capture()
-                    border_count += 1
-        # # Calculate expected border percentage
-        # total_border = 2 * (self.width + self.height - 2)  # Formula for perimeter tiles
-        # # print(f"Captured {border_count} border tiles (should be {total_border})")
+        # Only the outer ring is border at this point
+        for x, y in self.spawn_positions:
+            self.tiles[y][x].capture()
     
     def is_on_border(self, x, y):
         """Check if position is on any border (original or created)"""
@@ -81,6 +200,30 @@ class Field:
             return self.tiles[y][x].is_border
         return False
 
+    def trace_tiles(self, start, end):
+        """
+        Tiles crossed moving from start to end, 4-connected and excluding start
+
+        Bresenham-style walk that steps one axis at a time, so consecutive
+        tiles always share an edge and no tile along the way is skipped.
+        """
+        x, y = start
+        end_x, end_y = end
+        dx, dy = abs(end_x - x), abs(end_y - y)
+        step_x = 1 if end_x > x else -1
+        step_y = 1 if end_y > y else -1
+        error = dx - dy
+        tiles = []
+        for _ in range(dx + dy):
+            if x != end_x and (y == end_y or 2 * error > -dy):
+                x += step_x
+                error -= dy
+            else:
+                y += step_y
+                error += dx
+            tiles.append((x, y))
+        return tiles
+
     def are_adjacent(self, pos1, pos2):
         """Check if two positions are adjacent (including diagonally)"""
         x1, y1 = pos1
@@ -93,20 +236,296 @@ class Field:
             return self.tiles[y][x].captured
         return True  # Consider outside as captured
 
+    def build_distance_field(self):
+        """Compute the clearance of every tile from scratch"""
+        open_tiles = bytearray(not tile.captured for row in self.tiles for tile in row)
+        self.clearance = distance_transform(self.width, self.height, open_tiles)
+
+    def update_distance_field(self, blocked):
+        """
+        Lower clearances around newly captured tiles
+
+        Clearances only shrink during a round, so a breadth-first pass from
+        the edge of the new tiles touches just the area whose distance
+        changed; the inside of a captured pocket is zeroed but never queued.
+
+        Args:
+            blocked (list): (x, y) tiles that were just captured
+        """
+        width, height = self.width, self.height
+        dist = self.clearance
+        changed = self.layer_changes
+        for x, y in blocked:
+            index = y * width + x
+            if dist[index]:
+                dist[index] = 0
+                changed.add((x, y))
+        # Seed only the new tiles that still touch an open tile
+        queue = deque()
+        for x, y in blocked:
+            if 0 < x < width - 1 and 0 < y < height - 1:
+                above, below = (y - 1) * width + x, (y + 1) * width + x
+                index = y * width + x
+                if (dist[above - 1] or dist[above] or dist[above + 1] or
+                        dist[index - 1] or dist[index + 1] or
+                        dist[below - 1] or dist[below] or dist[below + 1]):
+                    queue.append((x, y))
+            elif any(dist[ny * width + nx]
+                     for ny in range(max(0, y - 1), min(height, y + 2))
+                     for nx in range(max(0, x - 1), min(width, x + 2))):
+                queue.append((x, y))
+        while queue:
+            x, y = queue.popleft()
+            d = dist[y * width + x] + 1
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                for nx in range(max(0, x - 1), min(width, x + 2)):
+                    if dist[ny * width + nx] > d:
+                        dist[ny * width + nx] = d
+                        queue.append((nx, ny))
+                        changed.add((nx, ny))
+
+    def build_regions(self):
+        """Label every connected uncaptured area from scratch"""
+        self.regions = array("I", bytes(4 * self.width * self.height))
+        self.region_sizes = {}
+        for y in range(self.height):
+            for x in range(self.width):
+                if not self.tiles[y][x].captured and not self.regions[y * self.width + x]:
+                    self.label_region(x, y, 0)
+
+    def label_region(self, x, y, old):
+        """
+        Give a new region id to the uncaptured tiles connected to (x, y)
+        that are still labelled `old`
+
+        Returns:
+            tuple: (region id, list of (x, y) member tiles)
+        """
+        width, height = self.width, self.height
+        regions = self.regions
+        region = self.next_region
+        self.next_region += 1
+        regions[y * width + x] = region
+        members = [(x, y)]
+        for x, y in members:  # Grows while iterating
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if (0 <= nx < width and 0 <= ny < height and
+                    regions[ny * width + nx] == old and not self.tiles[ny][nx].captured):
+                    regions[ny * width + nx] = region
+                    members.append((nx, ny))
+        self.region_sizes[region] = len(members)
+        return region, members
+
+    def split_region(self, region, seeds):
+        """
+        Relabel the pockets a capture trail cut out of a region
+
+        Floods from the seeds grow in lockstep and merge when they meet.
+        Once a single flood is left it hands its tiles back to the old id
+        without finishing, so the cost is that of the smaller pockets.
+
+        Args:
+            region (int): Region the trail ran through
+            seeds (list): Uncaptured (x, y) tiles of the region next to the trail
+
+        Returns:
+            dict: Pocket id -> member tiles, or None for a pocket that kept
+                  the old id before it was walked completely
+        """
+        width, height = self.width, self.height
+        regions = self.regions
+        changed = self.layer_changes
+        floods = {}  # Pocket id -> (frontier, members)
+        for x, y in seeds:
+            if regions[y * width + x] == region:
+                label = self.next_region
+                self.next_region += 1
+                regions[y * width + x] = label
+                changed.add((x, y))
+                floods[label] = ([(x, y)], [(x, y)])
+
+        pockets = {}
+        while len(floods) > 1:
+            for label in list(floods):
+                if label not in floods or len(floods) == 1:  # Merged or done this round
+                    continue
+                frontier, members = floods[label]
+                if not frontier:
+                    pockets[label] = members
+                    self.region_sizes[label] = len(members)
+                    del floods[label]
+                    continue
+                x, y = frontier.pop()
+                for dx, dy in DIRECTIONS:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < width and 0 <= ny < height):
+                        continue
+                    other = regions[ny * width + nx]
+                    if other == region:
+                        regions[ny * width + nx] = label
+                        changed.add((nx, ny))
+                        frontier.append((nx, ny))
+                        members.append((nx, ny))
+                    elif other != label and other in floods:
+                        # Two floods met: fold the smaller into the larger
+                        if len(members) < len(floods[other][1]):
+                            label, other = other, label
+                        frontier, members = floods[label]
+                        dropped_frontier, dropped_members = floods.pop(other)
+                        for mx, my in dropped_members:
+                            regions[my * width + mx] = label
+                        frontier.extend(dropped_frontier)
+                        members.extend(dropped_members)
+
+        for frontier, members in floods.values():
+            for x, y in members:
+                regions[y * width + x] = region
+            pockets[region] = None if frontier else members
+        self.region_sizes[region] -= sum(self.region_sizes[label] for label in pockets if label != region)
+        if region not in pockets:
+            del self.region_sizes[region]
+        return pockets
+
+    def region_tiles(self, x, y):
+        """All tiles of the region containing (x, y)"""
+        width, height = self.width, self.height
+        regions = self.regions
+        region = regions[y * width + x]
+        seen = {(x, y)}
+        members = [(x, y)]
+        for x, y in members:  # Grows while iterating
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if (0 <= nx < width and 0 <= ny < height and
+                    regions[ny * width + nx] == region and (nx, ny) not in seen):
+                    seen.add((nx, ny))
+                    members.append((nx, ny))
+        return members
+
+    def region_at(self, x, y):
+        """Region id of an uncaptured tile, 0 if captured or outside"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.regions[y * self.width + x]
+        return 0
+
+    def place(self, entity, x, y):
+        """Index an entity under tile (x, y), taking it off its previous tile"""
+        tile = (x, y)
+        previous = self.entity_tiles.get(entity)
+        if previous == tile:
+            return
+        if previous is not None:
+            others = self.occupants[previous]
+            others.remove(entity)
+            if not others:
+                del self.occupants[previous]
+        self.occupants.setdefault(tile, []).append(entity)
+        self.entity_tiles[entity] = tile
+
+    def occupants_at(self, x, y):
+        """Entities on tile (x, y)"""
+        return self.occupants.get((x, y), ())
+
+    def occupants_near(self, x, y, radius):
+        """Entities within `radius` tiles of (x, y), counting diagonals as one"""
+        occupants = self.occupants
+        found = []
+        for ny in range(y - radius, y + radius + 1):
+            for nx in range(x - radius, x + radius + 1):
+                here = occupants.get((nx, ny))
+                if here:
+                    found.extend(here)
+        return found
+
+    def clearance_at(self, x, y):
+        """Distance from an uncaptured tile to the nearest captured one (0 if captured)"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.clearance[y * self.width + x]
+        return 0
+
+    def clearance_gradient(self, x, y):
+        """Central-difference gradient of the clearance, pointing away from walls"""
+        return (self.clearance_at(x + 1, y) - self.clearance_at(x - 1, y),
+                self.clearance_at(x, y + 1) - self.clearance_at(x, y - 1))
+
+    def tile_code(self, x, y):
+        """Return the TILE_* state code of a tile"""
+        tile = self.tiles[y][x]
+        if tile.is_wire:
+            return TILE_WIRE
+        if tile.is_border:
+            return TILE_BORDER
+        if tile.captured:
+            return TILE_CAPTURED
+        return TILE_OPEN
+
+    def set_tile_code(self, x, y, code):
+        """Set a tile from a TILE_* state code (the inverse of tile_code)"""
+        tile = self.tiles[y][x]
+        tile.is_wire = code == TILE_WIRE
+        tile.is_border = code == TILE_BORDER
+        tile.captured = code in (TILE_CAPTURED, TILE_BORDER)
+        tile.color = (0, 0, 0) if tile.is_border else (100, 255, 100) if tile.captured else (200, 200, 200)
+        self.tile_changes.add((x, y))
+
+    def restore(self, wire_coordinates, created_borders, region_sizes, changed):
+        """
+        Finish a rewind after tiles and derived layers were written back
+
+        Args:
+            wire_coordinates (tuple): Wires of the restored tick
+            created_borders (frozenset): Created borders of the restored tick
+            region_sizes (dict): Region sizes of the restored tick
+            changed (set): Tiles whose state was written back
+        """
+        self.wire_coordinates = list(wire_coordinates)
+        self.wires = [Wire(x, y) for x, y in self.wire_coordinates]
+        self.created_borders = set(created_borders)
+        self.region_sizes = dict(region_sizes)
+        self.update_perimeter_around(changed)
+
+    def end_tick(self):
+        """Return the tiles changed during this tick and start a new change set"""
+        changes = self.tile_changes
+        self.tile_changes = set()
+        self.last_layer_changes = self.layer_changes
+        self.layer_changes = set()
+        return changes
+
     def update_perimeter(self):
         """Include created borders in perimeter"""
         self.perimeter = set()
         for y in range(self.height):
             for x in range(self.width):
-                if self.is_captured(x, y) or (x, y) in self.created_borders:
-                    # Check adjacent tiles
-                    for dy, dx in [(0,1),(1,0),(0,-1),(-1,0)]:
-                        nx, ny = x + dx, y + dy
-                        if (0 <= nx < self.width and 0 <= ny < self.height and 
-                            not self.is_captured(nx, ny) and 
-                            (nx, ny) not in self.created_borders):
-                            self.perimeter.add((x, y))
-                            break
+                if self.on_perimeter(x, y):
+                    self.perimeter.add((x, y))
+
+    def update_perimeter_around(self, changed):
+        """Refresh the perimeter for changed tiles and their neighbours only"""
+        nearby = set(changed)
+        for x, y in changed:
+            for dx, dy in DIRECTIONS:
+                nearby.add((x + dx, y + dy))
+        for x, y in nearby:
+            if self.on_perimeter(x, y):
+                self.perimeter.add((x, y))
+            else:
+                self.perimeter.discard((x, y))
+
+    def on_perimeter(self, x, y):
+        """Captured tile (or created border) next to an uncaptured one"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        if self.is_captured(x, y) or (x, y) in self.created_borders:
+            # Check adjacent tiles
+            for dy, dx in [(0,1),(1,0),(0,-1),(-1,0)]:
+                nx, ny = x + dx, y + dy
+                if (0 <= nx < self.width and 0 <= ny < self.height and 
+                    not self.is_captured(nx, ny) and 
+                    (nx, ny) not in self.created_borders):
+                    return True
+        return False
 
     def draw(self, surface):
         """Optimized drawing - only draw visible tiles"""
@@ -143,7 +562,17 @@ class Field:
                 self.wires.append(Wire(x, y))
                 self.wire_coordinates.append((x, y))
                 self.tiles[y][x].is_wire = True
+                self.tile_changes.add((x, y))
     
+    def clear_wires(self):
+        """Remove the current trail without capturing anything"""
+        for x, y in self.wire_coordinates:
+            self.tiles[y][x].is_wire = False
+            self.tile_changes.add((x, y))
+        self.wires = []
+        self.wire_coordinates = []
+        self.wire_owner = None
+
     def capture_area(self):
         """Capture the area enclosed by wires"""
         if len(self.wires) < 2:  # Need at least 2 points to determine direction
@@ -152,43 +581,46 @@ class Field:
             return
         
         capture_trail = set(self.wire_coordinates)
+        newly_captured = []
+        split = set()  # Regions the trail runs through
         # Capture all wire positions
         for wire in self.wires:
             if 0 <= wire.x < self.width and 0 <= wire.y < self.height:
                 self.tiles[wire.y][wire.x].capture()
                 self.tiles[wire.y][wire.x].is_wire = False
+                self.tile_changes.add((wire.x, wire.y))
+                newly_captured.append((wire.x, wire.y))
+                index = wire.y * self.width + wire.x
+                if self.regions[index]:
+                    split.add(self.regions[index])
+                    self.region_sizes[self.regions[index]] -= 1
+                    self.regions[index] = 0
+                    self.layer_changes.add((wire.x, wire.y))
         
-        # Determine flood fill starting points
-        direction = (self.wires[0].x - self.wires[1].x, self.wires[0].y - self.wires[1].y)
-        
-        # Create temporary matrices for flood fill
-        temp_left = [[False for _ in range(self.width)] for _ in range(self.height)]
-        temp_right = [[False for _ in range(self.width)] for _ in range(self.height)]
-        
-        for y in range(self.height):
-            for x in range(self.width):
-                temp_left[y][x] = self.is_captured(x, y)
-                temp_right[y][x] = self.is_captured(x, y)
-        
-        # Flood fill both sides
-        if direction[0]:  # Horizontal movement
-            self.flood_fill(temp_left, self.wires[1].x, self.wires[1].y + 1)
-            self.flood_fill(temp_right, self.wires[1].x, self.wires[1].y - 1)
-        else:  # Vertical movement
-            self.flood_fill(temp_left, self.wires[1].x + 1, self.wires[1].y)
-            self.flood_fill(temp_right, self.wires[1].x - 1, self.wires[1].y)
-        
-        # Choose the smaller area to capture
-        left_count = sum(sum(row) for row in temp_left)
-        right_count = sum(sum(row) for row in temp_right)
-        
-        target = temp_left if left_count < right_count else temp_right
+        # Relabel the pockets left of the split regions; every other region is unchanged
+        seeds = {region: [] for region in split}
+        for x, y in capture_trail:
+            for dx, dy in DIRECTIONS:
+                region = self.region_at(x + dx, y + dy)
+                if region in seeds:
+                    seeds[region].append((x + dx, y + dy))
+        pockets = {}
+        for region, region_seeds in seeds.items():
+            pockets.update(self.split_region(region, region_seeds))
         
         # Apply the capture
-        for y in range(self.height):
-            for x in range(self.width):
-                if target[y][x]:
-                    self.tiles[y][x].capture()
+        for region in self.choose_pockets(pockets, capture_trail):
+            members = pockets[region]
+            if members is None:  # Pocket that kept its id was never walked in full
+                start = next(tile for tile in seeds[region] if self.region_at(*tile) == region)
+                members = self.region_tiles(*start)
+            for x, y in members:
+                self.tiles[y][x].capture()
+                self.regions[y * self.width + x] = 0
+                self.layer_changes.add((x, y))
+                self.tile_changes.add((x, y))
+                newly_captured.append((x, y))
+            del self.region_sizes[region]
         
         for x, y in capture_trail:
             if not self.tiles[y][x].is_border and self.tiles[y][x].captured:  # Don't convert original borders
@@ -196,24 +628,48 @@ class Field:
                 self.tiles[y][x].color = (0, 0, 0)  # Black
                 
                 self.created_borders.add((x, y))
+                self.link_border(x, y)
         # Reset wires and update perimeter
         self.wires = []
         self.wire_coordinates = []
-        self.update_perimeter()
-
-
-    def flood_fill(self, matrix, x, y):
-        """Stack-based flood fill to avoid recursion limits"""
-        stack = [(x, y)]
-        while stack:
-            x, y = stack.pop()
-            if (0 <= x < self.width and 0 <= y < self.height and 
-                not matrix[y][x]):
-                matrix[y][x] = True
-                stack.append((x + 1, y))
-                stack.append((x - 1, y))
-                stack.append((x, y + 1))
-                stack.append((x, y - 1))
+        self.update_perimeter_around(newly_captured)
+        self.update_distance_field(newly_captured)
+        if self.on_capture is not None:
+            self.on_capture(len(capture_trail), len(newly_captured))
+
+
+    def choose_pockets(self, pockets, capture_trail):
+        """
+        Pick which pockets left by a trail get captured
+
+        Every pocket without a Qix is captured. With no Qix registered, the
+        smaller side of the trail's first step is captured instead.
+
+        Args:
+            pockets (dict): Region id of each pocket, as returned by split_region
+            capture_trail (set): Tiles of the trail
+        """
+        if self.qixes:
+            held = {self.region_at(int(qix.tile_x), int(qix.tile_y)) for qix in self.qixes}
+            free = [region for region in pockets if region not in held]
+            if pockets and len(free) == len(pockets) and any(
+                    (int(qix.tile_x), int(qix.tile_y)) in capture_trail for qix in self.qixes):
+                # A Qix standing on the trail keeps the largest pocket
+                free.remove(max(pockets, key=self.region_sizes.get))
+            return free
+
+        # Seeds on either side of the trail's second tile
+        first, second = self.wires[0], self.wires[1]
+        if first.x != second.x:  # Horizontal movement
+            left = self.region_at(second.x, second.y + 1)
+            right = self.region_at(second.x, second.y - 1)
+        else:  # Vertical movement
+            left = self.region_at(second.x + 1, second.y)
+            right = self.region_at(second.x - 1, second.y)
+        left_count = self.region_sizes[left] if left in pockets else 0
+        right_count = self.region_sizes[right] if right in pockets else 0
+        target = left if left_count < right_count else right
+        return [target] if target in pockets else []
 
     def capture_percentage(self):
         """Calculate percentage of captured area (excluding border tiles)"""
@@ -0,0 +1,234 @@
+import sys
+from array import array
+
+CHUNK_SIZE = 16  # Chunks are CHUNK_SIZE x CHUNK_SIZE tiles
+
+
+class Snapshot:
+    def __init__(self, tick, chunks, dirty, wires, created_borders, region_sizes, entities, cost):
+        """One recorded tick; unchanged parts are shared with the previous snapshot"""
+        self.tick = tick
+        self.chunks = chunks        # Tuple of immutable chunk byte strings
+        self.dirty = dirty          # frozenset of chunk indexes that differ from the previous snapshot
+        self.wires = wires          # Tuple of wire coordinates
+        self.created_borders = created_borders  # frozenset
+        self.region_sizes = region_sizes  # Dict, never modified once recorded
+        self.entities = entities    # Tuple of entity states
+        self.cost = cost            # Bytes first allocated by this snapshot
+
+
+class History:
+    def __init__(self, field, entities, max_ticks=3000, max_bytes=8 * 1024 * 1024,
+                 chunk_size=CHUNK_SIZE):
+        """
+        Copy-on-write history of the field and entities for rewinding
+
+        The grid is kept as fixed-size chunks holding the tile codes and
+        the field's derived layers (border adjacency, clearance and region
+        ids), so a rewind never rebuilds those over the whole grid.
+        Recording a tick rebuilds only the chunks containing changed tiles;
+        every other chunk, and any entity state that did not change, is
+        shared with the previous snapshot. Snapshots live in a ring indexed by tick, and the
+        oldest are evicted once the ring is full or over its memory budget.
+
+        Args:
+            field (Field): Field to record
+            entities (list): Objects with get_state()/set_state() (Player, Sparc, Qix)
+            max_ticks (int): Ring capacity in ticks
+            max_bytes (int): Memory budget for chunk data and snapshot overhead
+            chunk_size (int): Chunk width and height in tiles
+        """
+        self.field = field
+        self.entities = list(entities)
+        self.max_ticks = max_ticks
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.chunks_x = -(-field.width // chunk_size)
+        self.chunks_y = -(-field.height // chunk_size)
+        self.chunks = [self.build_chunk(i) for i in range(self.chunks_x * self.chunks_y)]
+        self.ring = [None] * max_ticks
+        self.first_tick = 0
+        self.next_tick = 0
+        self.used_bytes = 0
+        self.last = None
+
+    def chunk_bounds(self, index):
+        """(left, top, right, bottom) tile bounds of a chunk"""
+        size = self.chunk_size
+        left = (index % self.chunks_x) * size
+        top = (index // self.chunks_x) * size
+        return left, top, min(left + size, self.field.width), min(top + size, self.field.height)
+
+    def build_chunk(self, index):
+        """Read one chunk from the field: tile codes, adjacency, clearance, then region ids"""
+        field = self.field
+        width = field.width
+        left, top, right, bottom = self.chunk_bounds(index)
+        rows = range(top, bottom)
+        return b"".join((
+            bytes(field.tile_code(x, y) for y in rows for x in range(left, right)),
+            b"".join(field.border_adjacency[y * width + left:y * width + right] for y in rows),
+            b"".join(field.clearance[y * width + left:y * width + right] for y in rows),
+            b"".join(field.regions[y * width + left:y * width + right].tobytes() for y in rows),
+        ))
+
+    def chunk_index(self, x, y):
+        return (y // self.chunk_size) * self.chunks_x + x // self.chunk_size
+
+    def record(self, changes):
+        """
+        Snapshot the current tick
+
+        Args:
+            changes (set): Tiles changed this tick, as returned by Field.end_tick()
+        """
+        last = self.last
+        dirty = set()
+        touched = {self.chunk_index(x, y) for x, y in changes}
+        touched.update(self.chunk_index(x, y) for x, y in self.field.last_layer_changes)
+        for index in touched:
+            chunk = self.build_chunk(index)
+            if chunk != self.chunks[index]:  # Tiles may have changed back within the tick
+                self.chunks[index] = chunk
+                dirty.add(index)
+        dirty = frozenset(dirty)
+
+        if last is None:
+            chunks = tuple(self.chunks)
+            cost = sum(len(chunk) for chunk in chunks) + sys.getsizeof(chunks)
+        elif dirty:
+            chunks = tuple(self.chunks)
+            cost = sum(len(self.chunks[i]) for i in dirty) + sys.getsizeof(chunks)
+        else:
+            chunks = last.chunks
+            cost = 0
+
+        wires = tuple(self.field.wire_coordinates)
+        if last is not None and wires == last.wires:
+            wires = last.wires
+        else:
+            cost += sys.getsizeof(wires)
+        if last is not None and len(self.field.created_borders) == len(last.created_borders):
+            created_borders = last.created_borders  # Borders are only ever added
+        else:
+            created_borders = frozenset(self.field.created_borders)
+            cost += sys.getsizeof(created_borders)
+        if last is not None and self.field.region_sizes == last.region_sizes:
+            region_sizes = last.region_sizes
+        else:
+            region_sizes = dict(self.field.region_sizes)
+            cost += sys.getsizeof(region_sizes)
+
+        states = []
+        for i, entity in enumerate(self.entities):
+            state = entity.get_state()
+            if last is not None and state == last.entities[i]:
+                state = last.entities[i]
+            else:
+                cost += sys.getsizeof(state)
+            states.append(state)
+        entities = tuple(states)
+        if last is not None and entities == last.entities:
+            entities = last.entities
+        else:
+            cost += sys.getsizeof(entities)
+
+        snapshot = Snapshot(self.next_tick, chunks, dirty, wires, created_borders, region_sizes,
+                            entities, cost)
+        if self.next_tick - self.first_tick == self.max_ticks:
+            self.evict()
+        self.ring[self.next_tick % self.max_ticks] = snapshot
+        self.next_tick += 1
+        self.used_bytes += cost
+        self.last = snapshot
+        while self.used_bytes > self.max_bytes and self.next_tick - self.first_tick > 1:
+            self.evict()
+
+    def evict(self):
+        """Drop the oldest snapshot"""
+        oldest = self.ring[self.first_tick % self.max_ticks]
+        self.ring[self.first_tick % self.max_ticks] = None
+        self.first_tick += 1
+        self.used_bytes -= oldest.cost
+        successor = self.snapshot_at(self.first_tick)
+        if successor is not None:
+            # The successor takes over whatever it still shares with the evicted one
+            inherited = self.shared_cost(oldest, successor)
+            successor.cost += inherited
+            self.used_bytes += inherited
+
+    def shared_cost(self, older, newer):
+        """Bytes owned by `older` that `newer` still references"""
+        cost = sum(len(chunk) for index, chunk in enumerate(older.chunks)
+                   if index not in newer.dirty)
+        if newer.chunks is older.chunks:
+            cost += sys.getsizeof(older.chunks)
+        if newer.wires is older.wires:
+            cost += sys.getsizeof(older.wires)
+        if newer.created_borders is older.created_borders:
+            cost += sys.getsizeof(older.created_borders)
+        if newer.region_sizes is older.region_sizes:
+            cost += sys.getsizeof(older.region_sizes)
+        if newer.entities is older.entities:
+            cost += sys.getsizeof(older.entities)
+        for old_state, new_state in zip(older.entities, newer.entities):
+            if old_state is new_state:
+                cost += sys.getsizeof(old_state)
+        return cost
+
+    def __len__(self):
+        return self.next_tick - self.first_tick
+
+    def snapshot_at(self, tick):
+        """Return the snapshot for a tick still in the ring, or None"""
+        if self.first_tick <= tick < self.next_tick:
+            return self.ring[tick % self.max_ticks]
+        return None
+
+    def rewind(self, ticks):
+        """
+        Jump back up to `ticks` ticks and restore that state
+
+        Later snapshots are discarded, so play continues from the restored
+        tick. Returns the tick restored to, or None if nothing is recorded.
+        """
+        if self.last is None:
+            return None
+        tick = max(self.first_tick, self.last.tick - ticks)
+        snapshot = self.snapshot_at(tick)
+
+        # Only chunks that differ from the current grid are written back
+        field = self.field
+        changed = set()
+        for index, chunk in enumerate(snapshot.chunks):
+            if chunk is self.chunks[index]:
+                continue
+            left, top, right, bottom = self.chunk_bounds(index)
+            width = right - left
+            count = width * (bottom - top)
+            for offset, code in enumerate(chunk[:count]):
+                x, y = left + offset % width, top + offset // width
+                if field.tile_code(x, y) != code:
+                    field.set_tile_code(x, y, code)
+                    changed.add((x, y))
+            adjacency = chunk[count:2 * count]
+            clearance = chunk[2 * count:3 * count]
+            regions = array("I")
+            regions.frombytes(chunk[3 * count:])
+            for row, y in enumerate(range(top, bottom)):
+                start, end = y * field.width + left, y * field.width + right
+                span = slice(row * width, (row + 1) * width)
+                field.border_adjacency[start:end] = adjacency[span]
+                field.clearance[start:end] = clearance[span]
+                field.regions[start:end] = regions[span]
+            self.chunks[index] = chunk
+        field.restore(snapshot.wires, snapshot.created_borders, snapshot.region_sizes, changed)
+        for entity, state in zip(self.entities, snapshot.entities):
+            entity.set_state(state)
+
+        for later in range(tick + 1, self.next_tick):
+            self.used_bytes -= self.ring[later % self.max_ticks].cost
+            self.ring[later % self.max_ticks] = None
+        self.next_tick = tick + 1
+        self.last = snapshot
+        return tick
@@ -0,0 +1,201 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from Field import (TILE_OPEN, TILE_CAPTURED, TILE_BORDER, TILE_SIZE, DIRECTIONS,
+                   distance_transform)
+from Player import start_tile
+
+# Source level characters
+SOURCE_CODES = {".": TILE_OPEN, "x": TILE_CAPTURED, "#": TILE_BORDER, "S": TILE_BORDER}
+SPAWN_CHAR = "S"
+
+# Largest level that fits the 1000x700 game window: the field is drawn 50px
+# from the top and the health bars sit below it
+MAX_WIDTH = 1000 // TILE_SIZE
+MAX_HEIGHT = (700 - 100) // TILE_SIZE
+
+MAGIC = b"MQXL"
+VERSION = 3
+# magic, version, width, height, then (offset, count) for each section
+HEADER = struct.Struct("<4sHHH2x16I")
+SECTIONS = ("grid", "adjacency", "clearance", "perimeter", "uncaptured", "spawns",
+            "regions", "region_sizes")
+
+
+def parse_source(text):
+    """
+    Parse a text level into (width, height, grid codes, explicit spawns)
+
+    Each line is a row: '.' open, 'x' captured, '#' wall/border and
+    'S' a wall tile where Sparcs may spawn.
+    """
+    rows = [line.rstrip("\n") for line in text.splitlines() if line.strip()]
+    if not rows:
+        raise ValueError("Level source is empty")
+    width, height = len(rows[0]), len(rows)
+    grid = bytearray(width * height)
+    spawns = []
+    for y, row in enumerate(rows):
+        if len(row) != width:
+            raise ValueError(f"Row {y} is {len(row)} tiles wide, expected {width}")
+        for x, char in enumerate(row):
+            if char not in SOURCE_CODES:
+                raise ValueError(f"Unknown tile {char!r} at ({x}, {y})")
+            grid[y * width + x] = SOURCE_CODES[char]
+            if char == SPAWN_CHAR:
+                spawns.append(y * width + x)
+    return width, height, grid, spawns
+
+
+def derive_indexes(width, height, grid, spawns=None):
+    """Compute everything Field would otherwise derive at startup"""
+    adjacency = bytearray(width * height)
+    perimeter = array("I")
+    uncaptured = array("I")
+    ring = array("I")
+
+    for y in range(height):
+        for x in range(width):
+            index = y * width + x
+            code = grid[index]
+            if code == TILE_OPEN:
+                uncaptured.append(index)
+                continue
+            on_perimeter = False
+            for bit, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                neighbour = grid[ny * width + nx]
+                if code == TILE_BORDER and neighbour == TILE_BORDER:
+                    adjacency[index] |= 1 << bit
+                if neighbour == TILE_OPEN:
+                    on_perimeter = True
+            if on_perimeter:
+                perimeter.append(index)
+            if code == TILE_BORDER and (x in (0, width - 1) or y in (0, height - 1)):
+                ring.append(index)
+
+    spawn_list = array("I", spawns) if spawns else ring
+    clearance = distance_transform(width, height,
+                                   bytearray(code == TILE_OPEN for code in grid))
+    regions, region_sizes = label_regions(width, height, grid)
+    return {
+        "grid": grid,
+        "adjacency": adjacency,
+        "clearance": clearance,
+        "perimeter": perimeter,
+        "uncaptured": uncaptured,
+        "spawns": spawn_list,
+        "regions": regions,
+        "region_sizes": region_sizes,
+    }
+
+
+def label_regions(width, height, grid):
+    """
+    Label connected open areas the way Field.build_regions() does
+
+    Returns:
+        tuple: (region id per tile, 0 if not open; size of region id at id - 1)
+    """
+    regions = array("I", bytes(4 * width * height))
+    sizes = array("I")
+    for start in range(width * height):
+        if grid[start] != TILE_OPEN or regions[start]:
+            continue
+        region = len(sizes) + 1
+        regions[start] = region
+        members = [start]
+        for index in members:  # Grows while iterating
+            x, y = index % width, index // width
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                neighbour = ny * width + nx
+                if (0 <= nx < width and 0 <= ny < height and
+                        grid[neighbour] == TILE_OPEN and not regions[neighbour]):
+                    regions[neighbour] = region
+                    members.append(neighbour)
+        sizes.append(len(members))
+    return regions, sizes
+
+
+def compile_level(source_path, output_path):
+    """Compile a text level into a memory-mappable binary file"""
+    with open(source_path) as source:
+        width, height, grid, spawns = parse_source(source.read())
+    if width > MAX_WIDTH or height > MAX_HEIGHT:
+        raise ValueError(f"Level is {width}x{height} tiles, the window fits {MAX_WIDTH}x{MAX_HEIGHT}")
+    for edge in ("bottom", "top"):  # Player 1 and the two-player remote player
+        x, y = start_tile(width, height, edge)
+        if grid[y * width + x] != TILE_BORDER:
+            raise ValueError(f"Players start on ({x}, {y}), which must be a wall")
+    sections = derive_indexes(width, height, grid, spawns)
+    if not sections["spawns"]:
+        raise ValueError("Level has no border tile for Sparcs to spawn on")
+
+    blobs = []
+    table = []
+    offset = HEADER.size
+    for name in SECTIONS:
+        data = sections[name]
+        if isinstance(data, array):
+            if sys.byteorder != "little":
+                data = array("I", data)
+                data.byteswap()
+            blob = data.tobytes()
+            count = len(sections[name])
+        else:
+            blob = bytes(data)
+            count = len(blob)
+        blob += b"\0" * (-len(blob) % 4)  # Keep index sections 4-byte aligned
+        table += [offset, count]
+        blobs.append(blob)
+        offset += len(blob)
+
+    with open(output_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, VERSION, width, height, *table))
+        for blob in blobs:
+            output.write(blob)
+
+
+class Level:
+    def __init__(self, path):
+        """
+        A compiled level mapped read-only into memory
+
+        Sections are exposed as memoryviews over the map, so loading does
+        no parsing beyond the header.
+
+        Args:
+            path (str): Path to a file written by compile_level()
+        """
+        with open(path, "rb") as level_file:
+            self.map = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, *table = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a compiled mQIX level (version {VERSION})")
+        if sys.byteorder != "little":
+            raise ValueError("Compiled levels can only be mapped on little-endian machines")
+
+        view = memoryview(self.map)
+        for i, name in enumerate(SECTIONS):
+            offset, count = table[2 * i], table[2 * i + 1]
+            if name in ("grid", "adjacency", "clearance"):
+                section = view[offset:offset + count]
+            else:
+                section = view[offset:offset + 4 * count].cast("I")
+            setattr(self, name, section)
+
+
+def load_level(path):
+    """Map a compiled level file"""
+    return Level(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python Level.py SOURCE.txt OUTPUT.mqxl")
+    compile_level(sys.argv[1], sys.argv[2])
@@ -0,0 +1,497 @@
+import selectors
+import socket
+import struct
+from collections import deque
+
+# Message types
+KEYFRAME = 1
+DELTA = 2
+INPUT = 3  # Client to host: movement keys of the remote player
+
+# Entity kinds sent with every frame
+ENTITY_PLAYER = 0
+ENTITY_SPARC = 1
+ENTITY_QIX = 2
+
+HEADER = struct.Struct("!BI")           # message type, payload length
+FRAME = struct.Struct("!IIhhBB")        # tick, elapsed ms, health, player 2 health (-1 if none),
+                                        # capture %, entity count
+ENTITY = struct.Struct("!BHH")          # kind, tile x, tile y
+GRID = struct.Struct("!HHI")            # width, height, run count
+KEY_RUN = struct.Struct("!HB")          # run length, tile code
+DELTA_COUNT = struct.Struct("!I")       # run count
+DELTA_RUN = struct.Struct("!HHHB")      # y, x, run length, tile code
+INPUT_STATE = struct.Struct("!B")       # movement key bits (Player.key_mask)
+
+MAX_RUN = 0xFFFF
+MAX_INPUT_MESSAGE = 64  # Clients sending longer messages are disconnected
+
+
+def entity_states(players, sparcs, qixes):
+    """Quantize entity positions to (kind, tile_x, tile_y) tuples"""
+    entities = [(ENTITY_PLAYER, player.field_x, player.field_y) for player in players]
+    for sparc in sparcs:
+        entities.append((ENTITY_SPARC, sparc.tile_x, sparc.tile_y))
+    for qix in qixes:
+        entities.append((ENTITY_QIX, int(qix.tile_x), int(qix.tile_y)))
+    return entities
+
+
+def encode_frame(kind, tick, elapsed, entities, hud, body):
+    """Wrap a grid body with the frame header and entity list"""
+    health, health2, percentage = hud
+    health2 = -1 if health2 is None else max(0, int(health2))
+    parts = [FRAME.pack(tick, int(elapsed * 1000) & 0xFFFFFFFF, max(0, int(health)), health2,
+                        int(percentage), len(entities))]
+    for entity_kind, x, y in entities:
+        parts.append(ENTITY.pack(entity_kind, max(0, x), max(0, y)))
+    parts.append(body)
+    payload = b"".join(parts)
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_input(mask):
+    """Client message carrying the movement keys held this frame"""
+    return HEADER.pack(INPUT, INPUT_STATE.size) + INPUT_STATE.pack(mask)
+
+
+def encode_keyframe_runs(field):
+    """Run-length encode the whole grid in row-major order"""
+    runs = []
+    current = None
+    length = 0
+    for y in range(field.height):
+        for x in range(field.width):
+            code = field.tile_code(x, y)
+            if code == current and length < MAX_RUN:
+                length += 1
+            else:
+                if length:
+                    runs.append(KEY_RUN.pack(length, current))
+                current = code
+                length = 1
+    if length:
+        runs.append(KEY_RUN.pack(length, current))
+    return GRID.pack(field.width, field.height, len(runs)) + b"".join(runs)
+
+
+def encode_delta_runs(field, changes):
+    """Run-length encode changed tiles as horizontal runs of equal state"""
+    runs = []
+    run_y = run_x = current = None
+    length = 0
+    for x, y in sorted(changes, key=lambda pos: (pos[1], pos[0])):
+        code = field.tile_code(x, y)
+        if (y == run_y and x == run_x + length and code == current
+                and length < MAX_RUN):
+            length += 1
+            continue
+        if length:
+            runs.append(DELTA_RUN.pack(run_y, run_x, length, current))
+        run_y, run_x, current, length = y, x, code, 1
+    if length:
+        runs.append(DELTA_RUN.pack(run_y, run_x, length, current))
+    return DELTA_COUNT.pack(len(runs)) + b"".join(runs)
+
+
+class StateEncoder:
+    def __init__(self, field, keyframe_interval=100):
+        """
+        Turns per-tick Field change sets into stream messages
+
+        Args:
+            field (Field): Field whose state is streamed
+            keyframe_interval (int): Ticks between periodic keyframes
+        """
+        self.field = field
+        self.keyframe_interval = keyframe_interval
+        self.tick = 0
+        self.elapsed = 0.0
+        self.last_keyframe_tick = None
+
+    def keyframe(self, entities, hud):
+        """Encode the full grid for the current tick"""
+        self.last_keyframe_tick = self.tick
+        return encode_frame(KEYFRAME, self.tick, self.elapsed, entities, hud,
+                            encode_keyframe_runs(self.field))
+
+    def encode(self, changes, entities, hud, elapsed=0.0):
+        """
+        Encode one tick, returning (message, is_keyframe)
+
+        Args:
+            changes (set): Tiles returned by Field.end_tick()
+            entities (list): Output of entity_states()
+            hud (tuple): (player health, player 2 health or None, capture percentage)
+            elapsed (float): Seconds since the stream started, at the end of this tick
+        """
+        self.tick += 1
+        self.elapsed = elapsed
+        if (self.last_keyframe_tick is None or
+                self.tick - self.last_keyframe_tick >= self.keyframe_interval):
+            return self.keyframe(entities, hud), True
+        return encode_frame(DELTA, self.tick, elapsed, entities, hud,
+                            encode_delta_runs(self.field, changes)), False
+
+
+class StateDecoder:
+    def __init__(self):
+        """Rebuilds the grid, entities and HUD from a stream of messages"""
+        self.buffer = bytearray()
+        self.width = 0
+        self.height = 0
+        self.grid = bytearray()
+        self.entities = []
+        self.health = 0
+        self.health2 = None  # Second player's health, None in one-player games
+        self.percentage = 0
+        self.tick = None
+        self.time = 0.0  # Seconds since the stream started
+        self.synced = False
+
+    def feed(self, data):
+        """Consume raw bytes and return the number of messages applied"""
+        return sum(1 for _ in self.frames(data))
+
+    def frames(self, data=b""):
+        """Consume raw bytes, yielding after each message is applied"""
+        self.buffer += data
+        while len(self.buffer) >= HEADER.size:
+            kind, length = HEADER.unpack_from(self.buffer)
+            end = HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            payload = memoryview(self.buffer)[HEADER.size:end]
+            applied = self.apply(kind, payload)
+            payload.release()
+            del self.buffer[:end]
+            if applied:
+                yield self
+
+    def apply(self, kind, payload):
+        """Apply one message payload; deltas are ignored until the first keyframe"""
+        if kind == DELTA and not self.synced:
+            return False
+        tick, elapsed_ms, health, health2, percentage, count = FRAME.unpack_from(payload)
+        offset = FRAME.size
+        entities = []
+        for _ in range(count):
+            entities.append(ENTITY.unpack_from(payload, offset))
+            offset += ENTITY.size
+
+        if kind == KEYFRAME:
+            self.width, self.height, run_count = GRID.unpack_from(payload, offset)
+            offset += GRID.size
+            grid = bytearray()
+            for _ in range(run_count):
+                length, code = KEY_RUN.unpack_from(payload, offset)
+                offset += KEY_RUN.size
+                grid += bytes((code,)) * length
+            self.grid = grid
+            self.synced = True
+        elif kind == DELTA:
+            (run_count,) = DELTA_COUNT.unpack_from(payload, offset)
+            offset += DELTA_COUNT.size
+            for _ in range(run_count):
+                y, x, length, code = DELTA_RUN.unpack_from(payload, offset)
+                offset += DELTA_RUN.size
+                start = y * self.width + x
+                self.grid[start:start + length] = bytes((code,)) * length
+        else:
+            return False
+
+        self.tick = tick
+        self.time = elapsed_ms / 1000
+        self.health = health
+        self.health2 = None if health2 < 0 else health2
+        self.percentage = percentage
+        self.entities = entities
+        return True
+
+    def tile_code(self, x, y):
+        """Return the decoded TILE_* code at a tile"""
+        return self.grid[y * self.width + x]
+
+
+class ClientConnection:
+    def __init__(self, sock, address):
+        """Outgoing message queue for one connected client"""
+        self.sock = sock
+        self.address = address
+        self.queue = deque()
+        self.offset = 0  # Bytes of queue[0] already sent
+        self.queued = 0  # Bytes waiting to be sent
+        self.needs_keyframe = True
+        self.inbox = bytearray()  # Partial input messages
+        self.input_mask = 0  # Keys last reported, if this client is the remote player
+
+    def enqueue(self, message):
+        self.queue.append(message)
+        self.queued += len(message)
+
+    def drop_backlog(self):
+        """Discard unsent messages, keeping one that is partially sent"""
+        head = self.queue[0] if self.queue and self.offset else None
+        self.queue.clear()
+        self.queued = 0
+        if head is not None:
+            self.queue.append(head)
+            self.queued = len(head) - self.offset
+        self.needs_keyframe = True
+
+
+class StateServer:
+    def __init__(self, host="127.0.0.1", port=0, max_clients=8,
+                 max_backlog=64 * 1024, send_budget=16 * 1024, keyframe_interval=100):
+        """
+        Broadcasts the encoded field state to spectators and a remote player
+
+        Each tick is encoded once and the same bytes are queued for every
+        client, so per-client work is limited to a non-blocking send. The
+        first client to send input takes the second player's seat; input
+        from every other client is ignored.
+
+        Args:
+            host (str): Interface to listen on (loopback by default)
+            port (int): TCP port, 0 picks a free one
+            max_clients (int): Connections beyond this are refused
+            max_backlog (int): Queued bytes after which a client is resynced with a keyframe
+            send_budget (int): Maximum bytes sent to one client per tick
+            keyframe_interval (int): Ticks between periodic keyframes
+        """
+        self.max_clients = max_clients
+        self.max_backlog = max_backlog
+        self.send_budget = send_budget
+        self.keyframe_interval = keyframe_interval
+        self.encoder = None
+        self.elapsed = 0.0
+        self.clients = []
+        self.player_client = None
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.address = self.listener.getsockname()
+
+    def accept_clients(self):
+        """Accept pending connections and read client input without blocking"""
+        for key, _ in self.selector.select(timeout=0):
+            if key.fileobj is not self.listener:
+                if key.data in self.clients:
+                    self.read_input(key.data)
+                continue
+            try:
+                sock, address = self.listener.accept()
+            except BlockingIOError:
+                continue
+            if len(self.clients) >= self.max_clients:
+                sock.close()
+                continue
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = ClientConnection(sock, address)
+            self.clients.append(client)
+            self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def read_input(self, client, limit=4096):
+        """Read up to `limit` bytes from a client and apply complete input messages"""
+        try:
+            data = client.sock.recv(limit)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(client)
+            return
+        client.inbox += data
+        while len(client.inbox) >= HEADER.size:
+            kind, length = HEADER.unpack_from(client.inbox)
+            if length > MAX_INPUT_MESSAGE:
+                self.disconnect(client)
+                return
+            end = HEADER.size + length
+            if len(client.inbox) < end:
+                break
+            if kind == INPUT and length == INPUT_STATE.size:
+                if self.player_client is None:
+                    self.player_client = client
+                if self.player_client is client:
+                    (client.input_mask,) = INPUT_STATE.unpack_from(client.inbox, HEADER.size)
+            del client.inbox[:end]
+
+    def remote_input(self):
+        """Movement keys held by the remote player (0 if nobody has joined)"""
+        if self.player_client is None:
+            return 0
+        return self.player_client.input_mask
+
+    def broadcast(self, field, changes, entities, hud, dt=0.0):
+        """
+        Encode this tick's changes and queue them for every client
+
+        Args:
+            field (Field): The field being streamed
+            changes (set): Tiles returned by Field.end_tick()
+            entities (list): Output of entity_states()
+            hud (tuple): (player health, player 2 health or None, capture percentage)
+            dt (float): Seconds this tick lasted
+        """
+        self.elapsed += dt
+        if self.encoder is None or self.encoder.field is not field:
+            # New round: every client needs a fresh keyframe
+            self.encoder = StateEncoder(field, self.keyframe_interval)
+            for client in self.clients:
+                client.drop_backlog()
+
+        self.accept_clients()
+        message, is_keyframe = self.encoder.encode(changes, entities, hud, self.elapsed)
+        keyframe = message if is_keyframe else None
+
+        for client in self.clients:
+            if client.queued > self.max_backlog:
+                # Slow client: skip the deltas it missed and resync
+                client.drop_backlog()
+            if client.needs_keyframe:
+                if keyframe is None:
+                    keyframe = self.encoder.keyframe(entities, hud)
+                client.enqueue(keyframe)
+                client.needs_keyframe = False
+            else:
+                client.enqueue(message)
+
+        self.flush()
+
+    def flush(self):
+        """Send queued bytes to each client, at most send_budget per client"""
+        for client in list(self.clients):
+            budget = self.send_budget
+            try:
+                while client.queue and budget > 0:
+                    head = client.queue[0]
+                    chunk = memoryview(head)[client.offset:client.offset + budget]
+                    sent = client.sock.send(chunk)
+                    client.offset += sent
+                    client.queued -= sent
+                    budget -= sent
+                    if client.offset == len(head):
+                        client.queue.popleft()
+                        client.offset = 0
+                    elif sent < len(chunk):
+                        break  # Socket buffer is full
+            except BlockingIOError:
+                continue
+            except OSError:
+                self.disconnect(client)
+
+    def disconnect(self, client):
+        if client not in self.clients:
+            return
+        self.selector.unregister(client.sock)
+        client.sock.close()
+        self.clients.remove(client)
+        if self.player_client is client:
+            self.player_client = None  # Seat is free for the next client that sends input
+
+    def close(self):
+        for client in list(self.clients):
+            self.disconnect(client)
+        self.selector.close()
+        self.listener.close()
+
+
+class StateRecorder:
+    def __init__(self, path, keyframe_interval=100):
+        """
+        Writes the same message stream to a replay file
+
+        Args:
+            path (str): Replay file to create
+            keyframe_interval (int): Ticks between periodic keyframes
+        """
+        self.file = open(path, "wb")
+        self.keyframe_interval = keyframe_interval
+        self.encoder = None
+        self.elapsed = 0.0
+
+    def record(self, field, changes, entities, hud, dt):
+        """
+        Append one tick; a new Field (new round) starts with a keyframe
+
+        Args:
+            dt (float): Seconds this tick lasted, stored so playback keeps real time
+        """
+        self.elapsed += dt
+        if self.encoder is None or self.encoder.field is not field:
+            self.encoder = StateEncoder(field, self.keyframe_interval)
+        message, _ = self.encoder.encode(changes, entities, hud, self.elapsed)
+        self.file.write(message)
+
+    def close(self):
+        self.file.close()
+
+
+def read_replay(path, chunk_size=1 << 16):
+    """Yield a StateDecoder after each tick of a recorded replay"""
+    decoder = StateDecoder()
+    with open(path, "rb") as replay:
+        while True:
+            data = replay.read(chunk_size)
+            if not data:
+                break
+            yield from decoder.frames(data)
+
+
+class StateClient:
+    def __init__(self, host="127.0.0.1", port=0):
+        """Connection that keeps a StateDecoder up to date and can send input"""
+        self.sock = socket.create_connection((host, port))
+        self.sock.setblocking(False)
+        self.decoder = StateDecoder()
+        self.connected = True
+        self.outbox = bytearray()
+
+    def poll(self):
+        """Read whatever has arrived and return the number of messages applied"""
+        applied = 0
+        while self.connected:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            if not data:
+                self.connected = False
+                break
+            applied += self.decoder.feed(data)
+        return applied
+
+    def send_input(self, mask, max_backlog=256):
+        """
+        Send the movement keys held this frame to the host
+
+        Messages are dropped rather than queued once the host stops
+        reading; the next frame reports the keys again anyway.
+
+        Args:
+            mask (int): Key bits from Player.key_mask()
+            max_backlog (int): Unsent bytes after which new input is dropped
+        """
+        if not self.connected:
+            return
+        if len(self.outbox) < max_backlog:
+            self.outbox += encode_input(mask)
+        try:
+            sent = self.sock.send(self.outbox)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.connected = False
+            return
+        del self.outbox[:sent]
+
+    def close(self):
+        self.sock.close()
+        self.connected = False
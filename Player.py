@@ -3,26 +3,62 @@ import math
 from utils import *
 
 TILE_SIZE = 5  # Each tile is 5x5 pixels
+TILES_PER_SECOND = 40  # Same pace as the old TILE_SIZE // 2 pixels per frame at 100 FPS
+FRAME_TIME = 1 / 100  # Default time step in seconds
+MAX_STEP_TIME = 0.1  # Longer frames are clamped so a stall does not teleport the player
+
+# Movement keys as bits, for input sent over the network
+KEY_BITS = {
+    pygame.K_LEFT: 1, pygame.K_a: 1,
+    pygame.K_RIGHT: 2, pygame.K_d: 2,
+    pygame.K_UP: 4, pygame.K_w: 4,
+    pygame.K_DOWN: 8, pygame.K_s: 8,
+    pygame.K_LSHIFT: 16, pygame.K_RSHIFT: 16,
+}
+
+def key_mask(keys):
+    """Pack the movement keys of pygame.key.get_pressed() into KEY_BITS"""
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if keys[key]:
+            mask |= bit
+    return mask
+
+def start_tile(width, height, edge="bottom"):
+    """Tile a Player starts on in a field of this size: mid bottom (or top) row"""
+    x = (width * TILE_SIZE // 2 - TILE_SIZE // 2) // TILE_SIZE
+    return (x, 0 if edge == "top" else height - 1)
+
+class RemoteKeys:
+    def __init__(self, mask):
+        """Key states rebuilt from a key_mask(), indexed like pygame.key.get_pressed()"""
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
 
 class Player():
-    def __init__(self, field, color=(0, 255, 0), size=TILE_SIZE):
+    def __init__(self, field, color=(0, 255, 0), size=TILE_SIZE, speed=TILES_PER_SECOND,
+                 start_edge="bottom"):
         self.field = field
         self.health = 100
         self.max_health = 100
         self.color = color
         self.size = size * 2
-        self.speed = TILE_SIZE // 2  # Slower movement (originally was TILE_SIZE)
-        # Start position perfectly aligned on bottom border
-        self.position = (
-            field.x + (field.width * TILE_SIZE) // 2 - (size // 2),
-            field.y + field.height * TILE_SIZE - field.border_width * TILE_SIZE
-        )
-        self.on_edge = "bottom"
+        self.speed = speed  # Tiles per second, independent of frame rate
+        # Start position perfectly aligned on the bottom (or top) border
+        if start_edge == "top":
+            start_y = field.y
+        else:
+            start_y = field.y + field.height * TILE_SIZE - field.border_width * TILE_SIZE
+        self.position = (field.x + (field.width * TILE_SIZE) // 2 - (size // 2), start_y)
+        self.on_edge = start_edge
         self.in_field = False
         self.direction = None
         self.trail = []
         self.capturing = False
         self.capture_start_pos = None
+        field.place(self, self.field_x, self.field_y)
 
     @property
     def field_x(self):
@@ -34,6 +70,22 @@ class Player():
         """Current y position in tile coordinates"""
         return int((self.position[1] - self.field.y) // TILE_SIZE)
 
+    def get_state(self):
+        """Immutable snapshot of the Player for rewinding"""
+        return (self.position, self.health, tuple(self.trail), self.capturing,
+                self.capture_start_pos, self.on_edge)
+
+    def set_state(self, state):
+        """Restore a snapshot taken by get_state()"""
+        (self.position, self.health, trail, self.capturing,
+         self.capture_start_pos, self.on_edge) = state
+        self.trail = list(trail)
+        self.field.place(self, self.field_x, self.field_y)
+        if self.capturing:
+            self.field.wire_owner = self
+        elif self.field.wire_owner is self:
+            self.field.wire_owner = None
+
     def draw(self, surface):
         # Draw trail
         if len(self.trail) > 1:
@@ -45,19 +97,8 @@ class Player():
         color = (0, 200, 0) if self.in_field else self.color
         pygame.draw.rect(surface, color, (*self.position, self.size, self.size))
 
-    def draw_health_bar(self, surface, screen_height=400):
-        bar_width = 200
-        bar_height = 20
-        bar_x = 20
-        bar_y = screen_height - 40
-
-        # Black outline
-        pygame.draw.rect(surface, (0, 0, 0), (bar_x-2, bar_y-2, bar_width+4, bar_height+4))
-        # Background
-        pygame.draw.rect(surface, (200, 0, 0), (bar_x, bar_y, bar_width, bar_height))
-        # Health
-        fill_width = (self.health / self.max_health) * bar_width
-        pygame.draw.rect(surface, (0, 255, 0), (bar_x, bar_y, fill_width, bar_height))
+    def draw_health_bar(self, surface, screen_height=400, bar_x=20):
+        draw_health_bar(surface, self.health, self.max_health, screen_height, bar_x)
     
     def is_on_border(self, x=None, y=None):
         """Check if player is on or adjacent to border tiles"""
@@ -65,78 +106,126 @@ class Player():
             x, y = self.field_x, self.field_y
         return self.field.is_on_border(x, y)
 
-    def move(self, keys):
-        """Move the Player at slower speed while maintaining all original logic"""
-        new_x, new_y = self.position
-        moved = False   
-        
+    def move(self, keys, dt=FRAME_TIME):
+        """
+        Sweep the Player along the pressed direction for dt seconds
+
+        The path from the current tile to the destination tile is
+        rasterized and every tile crossed goes through step(), so fast
+        movement or long frames never leave gaps in the wire.
+
+        Args:
+            keys: Key states from pygame.key.get_pressed()
+            dt (float): Seconds since the last move
+        """
+        direction = None
         if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            new_x -= self.speed
-            moved = True
+            direction = (-1, 0)
         elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            new_x += self.speed
-            moved = True
+            direction = (1, 0)
         elif keys[pygame.K_UP] or keys[pygame.K_w]:
-            new_y -= self.speed
-            moved = True
+            direction = (0, -1)
         elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            new_y += self.speed
-            moved = True
-
-        if moved:
-            # Convert to field coordinates
-            new_field_pos = (int((new_x - self.field.x) // TILE_SIZE), 
-                            int((new_y - self.field.y) // TILE_SIZE))
-            current_field_pos = (self.field_x, self.field_y)
-            
+            direction = (0, 1)
+
+        if direction:
             shift_pressed = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
-            
-            # If shift is held (attempting to push into field)
-            if shift_pressed:
-                if (self.is_on_border() or  
-                    (self.capturing and 
-                     self.field.are_adjacent(current_field_pos, new_field_pos) and
-                     not self.field.is_captured(*new_field_pos))):
-                    
-                    if not self.capturing:
-                        self.capturing = True
-                        self.capture_start_pos = current_field_pos
-                        self.field.push(*current_field_pos)
-                        self.trail.append(current_field_pos)
-                    
-                    self.position = (new_x, new_y)
-                    self.field.push(*new_field_pos)
-                    self.trail.append(new_field_pos)
-                
-                elif (self.capturing and 
-                      self.is_on_border(*new_field_pos)):
-                    
-                    self.field.capture_area()
-                    self.position = (new_x, new_y)
-                    self.trail = []
-                    self.capturing = False
-                    self.capture_start_pos = None
-            
-            # Normal movement (along borders)
-            else:
-                if self.is_on_border(*new_field_pos):
-                    self.position = (new_x, new_y)
-                    if self.trail:
-                        self.trail = []
-                        self.capturing = False
-                        self.capture_start_pos = None
+            distance = self.speed * TILE_SIZE * min(dt, MAX_STEP_TIME)  # Pixels
+            start_x, start_y = self.position
+            target_x = start_x + direction[0] * distance
+            target_y = start_y + direction[1] * distance
+            target_tile = (int((target_x - self.field.x) // TILE_SIZE),
+                           int((target_y - self.field.y) // TILE_SIZE))
+            start_tile = (self.field_x, self.field_y)
+
+            tiles = self.field.trace_tiles(start_tile, target_tile)
+            if not tiles:
+                # Movement within the same tile
+                self.step(target_x, target_y, shift_pressed)
+            for tile in tiles:
+                if tile == target_tile:
+                    new_position = (target_x, target_y)
                 else:
-                    self.snap_to_border()
+                    # Keep the offset within the tile while crossing it
+                    new_position = (start_x + (tile[0] - start_tile[0]) * TILE_SIZE,
+                                    start_y + (tile[1] - start_tile[1]) * TILE_SIZE)
+                if not self.step(*new_position, shift_pressed):
+                    break
+            self.field.place(self, self.field_x, self.field_y)
+
+        self.update_edge_status()
 
-            if self.field.is_on_border(*new_field_pos):
+    def step(self, new_x, new_y, shift_pressed):
+        """Move to a position on a neighbouring tile; return False if refused"""
+        # Convert to field coordinates
+        new_field_pos = (int((new_x - self.field.x) // TILE_SIZE), 
+                        int((new_y - self.field.y) // TILE_SIZE))
+        current_field_pos = (self.field_x, self.field_y)
+        
+        # Only one trail can be drawn at a time (the other player may own it)
+        can_draw = not self.field.wires or self.field.wire_owner is self
+        
+        # If shift is held (attempting to push into field)
+        if shift_pressed:
+            if can_draw and (self.is_on_border() or  
+                (self.capturing and 
+                 self.field.are_adjacent(current_field_pos, new_field_pos) and
+                 not self.field.is_captured(*new_field_pos))):
+                
+                if not self.capturing:
+                    self.capturing = True
+                    self.capture_start_pos = current_field_pos
+                    self.field.wire_owner = self
+                    self.field.push(*current_field_pos)
+                    self.trail.append(current_field_pos)
+                
+                self.position = (new_x, new_y)
+                self.field.push(*new_field_pos)
+                self.trail.append(new_field_pos)
+            
+            elif (self.capturing and 
+                  self.is_on_border(*new_field_pos)):
+                
+                self.field.capture_area()
+                self.position = (new_x, new_y)
+                self.trail = []
+                self.capturing = False
+                self.capture_start_pos = None
+        
+        # Normal movement (along borders)
+        else:
+            if self.is_on_border(*new_field_pos):
                 self.position = (new_x, new_y)
                 if self.trail:
                     self.trail = []
                     self.capturing = False
                     self.capture_start_pos = None
+            else:
+                self.snap_to_border()
 
-        self.update_edge_status()
+        if self.field.is_on_border(*new_field_pos):
+            self.position = (new_x, new_y)
+            if self.trail:
+                self.trail = []
+                self.capturing = False
+                self.capture_start_pos = None
+
+        if not self.capturing and self.field.wire_owner is self:
+            self.field.wire_owner = None  # Trail closed or abandoned
+        return self.position == (new_x, new_y)
     
+    def drop_trail(self):
+        """Abandon an unfinished trail (player died or left) and go back to where it started"""
+        if self.field.wire_owner is self:
+            self.field.clear_wires()
+        if self.capture_start_pos is not None:
+            start_x, start_y = self.capture_start_pos
+            self.position = (self.field.x + start_x * TILE_SIZE, self.field.y + start_y * TILE_SIZE)
+            self.field.place(self, self.field_x, self.field_y)
+        self.trail = []
+        self.capturing = False
+        self.capture_start_pos = None
+
     def snap_to_border(self):
         """Adjust position to stay perfectly on border tiles"""
         field_x = self.field_x
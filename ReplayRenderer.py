@@ -0,0 +1,79 @@
+import pygame
+
+from Field import TILE_SIZE, TILE_OPEN, TILE_CAPTURED, TILE_BORDER, TILE_WIRE
+from Network import ENTITY_PLAYER, ENTITY_SPARC, ENTITY_QIX
+from utils import draw_health_bar
+
+SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 700
+
+# Same colours as Field.draw
+PALETTE = [(0, 0, 0)] * 256
+PALETTE[TILE_OPEN] = (200, 200, 200)
+PALETTE[TILE_CAPTURED] = (100, 255, 100)
+PALETTE[TILE_BORDER] = (0, 0, 0)
+PALETTE[TILE_WIRE] = (150, 150, 150)
+
+
+class ReplayRenderer:
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        """
+        Draws decoded game state into an offscreen Surface
+
+        The tile grid is wrapped as an 8-bit palettized Surface sharing the
+        decoder's buffer and scaled up in one call, so no per-tile or
+        per-pixel Python work happens per frame.
+        """
+        pygame.font.init()
+        self.surface = pygame.Surface((width, height), 0, 32)
+        self.font = pygame.font.Font(None, 36)
+        self.grid = None
+        self.grid_surface = None
+        self.scaled = None
+
+    def wrap_grid(self, decoder):
+        """(Re)wrap the decoder's grid after a keyframe replaced it"""
+        self.grid = decoder.grid
+        size = (decoder.width, decoder.height)
+        self.grid_surface = pygame.image.frombuffer(self.grid, size, "P")
+        self.grid_surface.set_palette(PALETTE)
+        scaled_size = (decoder.width * TILE_SIZE, decoder.height * TILE_SIZE)
+        if self.scaled is None or self.scaled.get_size() != scaled_size:
+            self.scaled = pygame.Surface(scaled_size, 0, 8)
+            self.scaled.set_palette(PALETTE)
+
+    def render(self, decoder):
+        """Draw the field, entities and HUD for the decoder's current tick"""
+        if decoder.grid is not self.grid:
+            self.wrap_grid(decoder)
+        surface = self.surface
+        surface.fill((255, 255, 255))
+
+        # Same placement as mqix.py: centred horizontally, 50px from the top
+        field_x = (surface.get_width() - decoder.width * TILE_SIZE) // 2
+        field_y = 50
+        pygame.transform.scale(self.grid_surface, self.scaled.get_size(), self.scaled)
+        surface.blit(self.scaled, (field_x, field_y))
+
+        for kind, x, y in decoder.entities:
+            center = (field_x + x * TILE_SIZE + TILE_SIZE // 2,
+                      field_y + y * TILE_SIZE + TILE_SIZE // 2)
+            if kind == ENTITY_PLAYER:
+                pygame.draw.rect(surface, (0, 255, 0),
+                                 (field_x + x * TILE_SIZE, field_y + y * TILE_SIZE,
+                                  TILE_SIZE * 2, TILE_SIZE * 2))
+            elif kind == ENTITY_SPARC:
+                cx, cy = center
+                pygame.draw.polygon(surface, (255, 0, 0),
+                                    [(cx + 5, cy), (cx, cy + 5), (cx - 5, cy), (cx, cy - 5)])
+            elif kind == ENTITY_QIX:
+                pygame.draw.circle(surface, (255, 165, 0), center, 12)
+                pygame.draw.circle(surface, (255, 255, 255), center, 7, 2)
+
+        draw_health_bar(surface, decoder.health, 100, surface.get_height())
+        if decoder.health2 is not None:
+            # Second player's bar on the right, as in mqix.py
+            draw_health_bar(surface, decoder.health2, 100, surface.get_height(),
+                            surface.get_width() - 220)
+        capture_text = self.font.render(f"Captured: {decoder.percentage}%", True, (0, 0, 0))
+        surface.blit(capture_text, (20, 20))
+        return surface
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FrameScheduler:
+    def __init__(self, fps=100, margin=0.001, workers=2, max_delay=0.25):
+        """
+        Paces an asyncio game loop and fits side work around the frames
+
+        Deferred callables run on the loop thread in the time left before
+        each frame's deadline; one that has waited max_delay runs even if
+        frames are over budget. Blocking work goes to a thread pool, and
+        file writes to a single writer thread so they land in order.
+
+        Args:
+            fps (int): Target frame rate
+            margin (float): Seconds kept free before each deadline
+            workers (int): Threads for blocking work (heavy computation)
+            max_delay (float): Seconds a deferred callable may wait for spare time
+        """
+        self.frame_time = 1 / fps
+        self.margin = margin
+        self.max_delay = max_delay
+        self.deferred = deque()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mqix")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mqix-writer")
+        self.frame_start = time.perf_counter()
+        self.dt = 0.0  # Seconds the last frame took
+
+    def defer(self, func, *args):
+        """Run func(*args) on the loop thread once a frame has spare time"""
+        self.deferred.append((time.perf_counter() + self.max_delay, func, args))
+
+    def run_in_executor(self, func, *args):
+        """Run blocking func(*args) on the thread pool, returning an awaitable"""
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def write_file(self, path, data, mode="w"):
+        """Write a file off the loop thread; writes happen in the order requested"""
+        def write():
+            with open(path, mode) as output:
+                output.write(data)
+        return asyncio.get_running_loop().run_in_executor(self.writer, write)
+
+    def run_deferred(self, deadline):
+        """Run deferred work that fits before the deadline or has waited too long"""
+        while self.deferred:
+            now = time.perf_counter()
+            if now + self.margin >= deadline and now < self.deferred[0][0]:
+                break
+            _, func, args = self.deferred.popleft()
+            func(*args)
+
+    async def next_frame(self):
+        """
+        Finish the current frame and wait for the next one
+
+        Spends the leftover budget on deferred work, then sleeps until the
+        deadline so background tasks get to run. Returns the frame time.
+        """
+        deadline = self.frame_start + self.frame_time
+        self.run_deferred(deadline)
+        await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+        now = time.perf_counter()
+        self.dt = now - self.frame_start
+        self.frame_start = now
+        return self.dt
+
+    async def close(self):
+        """Run the remaining deferred work and wait for pending thread work"""
+        while self.deferred:
+            _, func, args = self.deferred.popleft()
+            func(*args)
+        self.executor.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
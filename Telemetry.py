@@ -0,0 +1,162 @@
+import json
+import time
+from array import array
+
+# Hit kinds stored in the numeric hit records
+HIT_SPARC = 0
+HIT_QIX = 1
+HIT_NAMES = {HIT_SPARC: "sparc", HIT_QIX: "qix"}
+
+# Fields written as seconds; every other field is a whole number
+TIME_FIELDS = ("time", "since_last")
+
+
+class EventRing:
+    def __init__(self, name, fields, capacity):
+        """
+        Fixed-size ring of numeric records in one preallocated array
+
+        Writers take a slot() offset and store each field straight into
+        `data`, so recording an event allocates no containers.
+
+        Args:
+            name (str): Event name written to the JSONL sink
+            fields (tuple): Field names of a record
+            capacity (int): Records kept before the oldest are overwritten
+        """
+        self.name = name
+        self.fields = fields
+        self.width = len(fields)
+        self.capacity = capacity
+        self.data = array("d", bytes(8 * self.width * capacity))
+        self.written = 0  # Records ever written
+        self.flushed = 0  # Records already handed to the sink
+
+    def slot(self):
+        """Reserve the next record and return its offset into data"""
+        offset = (self.written % self.capacity) * self.width
+        self.written += 1
+        return offset
+
+    def pending(self):
+        return self.written - self.flushed
+
+    def drain(self):
+        """Copy out unflushed records, returning (records, number overwritten)"""
+        start = max(self.flushed, self.written - self.capacity)
+        dropped = start - self.flushed
+        records = []
+        for index in range(start, self.written):
+            offset = (index % self.capacity) * self.width
+            records.append(self.data[offset:offset + self.width])
+        self.flushed = self.written
+        return records, dropped
+
+
+class Telemetry:
+    def __init__(self, path, capacity=4096):
+        """
+        Per-session gameplay analytics written to a JSONL file
+
+        Args:
+            path (str): JSONL file to append to
+            capacity (int): Records kept per event type between flushes
+        """
+        self.path = path
+        self.session = time.strftime("%Y%m%dT%H%M%S")
+        self.round = 0
+        self.start = time.perf_counter()
+        self.last_capture = self.start
+        self.last_percentage = -1
+        self.captures = EventRing("capture", ("time", "length", "area", "since_last"), capacity)
+        self.hits = EventRing("hit", ("time", "kind", "x", "y", "damage"), capacity)
+        self.coverage = EventRing("percentage", ("time", "percentage"), capacity)
+        self.rings = (self.captures, self.hits, self.coverage)
+
+    def new_round(self):
+        self.round += 1
+        self.start = time.perf_counter()
+        self.last_capture = self.start
+        self.last_percentage = -1
+
+    def capture(self, length, area):
+        """Record a capture: trail length and tiles captured (Field.on_capture)"""
+        now = time.perf_counter()
+        ring = self.captures
+        offset = ring.slot()
+        data = ring.data
+        data[offset] = now - self.start
+        data[offset + 1] = length
+        data[offset + 2] = area
+        data[offset + 3] = now - self.last_capture
+        self.last_capture = now
+
+    def hit(self, kind, x, y, damage):
+        """Record an enemy hitting the player at tile (x, y)"""
+        ring = self.hits
+        offset = ring.slot()
+        data = ring.data
+        data[offset] = time.perf_counter() - self.start
+        data[offset + 1] = kind
+        data[offset + 2] = x
+        data[offset + 3] = y
+        data[offset + 4] = damage
+
+    def percentage(self, value):
+        """Record the capture percentage when it changes"""
+        if value == self.last_percentage:
+            return
+        self.last_percentage = value
+        ring = self.coverage
+        offset = ring.slot()
+        ring.data[offset] = time.perf_counter() - self.start
+        ring.data[offset + 1] = value
+
+    def needs_flush(self):
+        """True once any ring is half full"""
+        return any(ring.pending() * 2 >= ring.capacity for ring in self.rings)
+
+    def drain(self):
+        """
+        Take every unflushed record out of the rings (cheap; run on the game thread)
+
+        Returns (session, round, [(ring, records, dropped), ...]); the round
+        is read here so a new round starting before formatting can't relabel it.
+        """
+        return self.session, self.round, [(ring, *ring.drain()) for ring in self.rings]
+
+    def format(self, drained):
+        """Turn the output of drain() into JSONL text"""
+        session, round_number, rings = drained
+        lines = []
+        for ring, records, dropped in rings:
+            for record in records:
+                event = {"session": session, "round": round_number, "event": ring.name}
+                for field, value in zip(ring.fields, record):
+                    event[field] = value if field in TIME_FIELDS else int(value)
+                if ring is self.hits:
+                    event["kind"] = HIT_NAMES.get(event["kind"], "unknown")
+                lines.append(json.dumps(event))
+            if dropped:
+                lines.append(json.dumps({"session": session, "round": round_number,
+                                         "event": "dropped", "type": ring.name, "count": dropped}))
+        return "".join(line + "\n" for line in lines)
+
+    def flush(self, scheduler=None):
+        """
+        Append pending records to the JSONL file
+
+        With a scheduler, formatting is deferred to spare frame time and
+        the file is written by its writer thread; otherwise both run here.
+        """
+        drained = self.drain()
+        if not any(records or dropped for _, records, dropped in drained[2]):
+            return
+        if scheduler is None:
+            with open(self.path, "a") as sink:
+                sink.write(self.format(drained))
+            return
+        scheduler.defer(self.write, scheduler, drained)
+
+    def write(self, scheduler, drained):
+        scheduler.write_file(self.path, self.format(drained), "a")
@@ -0,0 +1,102 @@
+"""
+Offscreen export of recorded sessions to video.
+
+Replays written by `python mqix.py --record session.mqxr` are decoded tick by
+tick, rendered into an offscreen Surface and streamed as raw frames into an
+encoder subprocess (ffmpeg by default). Output frames are picked by each
+tick's recorded timestamp, so the video plays at real speed whatever frame
+rate the game ran at:
+
+    python export_video.py session.mqxr session.mp4
+    python export_video.py session.mqxr - > frames.raw   # raw frames on stdout
+"""
+import os
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # No window needed
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import subprocess
+import sys
+import time
+
+import pygame
+
+from Network import read_replay
+from ReplayRenderer import ReplayRenderer
+
+
+def raw_pixel_format(surface):
+    """ffmpeg pix_fmt matching the Surface's memory layout, or None"""
+    if sys.byteorder != "little" or surface.get_pitch() != surface.get_width() * 4:
+        return None
+    red, green, blue = surface.get_shifts()[:3]
+    channels = {red: "r", green: "g", blue: "b"}
+    layout = "".join(channels.get(8 * i, "0") for i in range(4))
+    return layout if layout in ("bgr0", "rgb0", "0rgb", "0bgr") else None
+
+
+def export(replay_path, output, fps=50, ffmpeg="ffmpeg"):
+    """Render a replay and stream the frames to ffmpeg (or stdout for '-')"""
+    renderer = ReplayRenderer()
+    surface = renderer.surface
+    pixel_format = raw_pixel_format(surface)
+    if pixel_format is None:
+        pixel_format = "rgb24"  # Fall back to a converted copy per frame
+
+    if output == "-":
+        encoder = None
+        sink = sys.stdout.buffer
+    else:
+        width, height = surface.get_size()
+        try:
+            encoder = subprocess.Popen(
+                [ffmpeg, "-loglevel", "error", "-y",
+                 "-f", "rawvideo", "-pix_fmt", pixel_format, "-s", f"{width}x{height}",
+                 "-r", str(fps), "-i", "-",
+                 "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", output],
+                stdin=subprocess.PIPE)
+        except FileNotFoundError:
+            sys.exit(f"Encoder {ffmpeg!r} not found; install ffmpeg or pass --ffmpeg")
+        sink = encoder.stdin
+
+    frames = 0
+    start = time.perf_counter()
+    try:
+        for decoder in read_replay(replay_path):
+            # Output frame n shows the game at n / fps seconds: a tick is
+            # repeated while it covers several frames and skipped if it covers none
+            rendered = False
+            while frames / fps <= decoder.time:
+                if not rendered:
+                    renderer.render(decoder)
+                    rendered = True
+                if pixel_format == "rgb24":
+                    sink.write(pygame.image.tobytes(surface, "RGB"))
+                else:
+                    sink.write(surface.get_view("0"))  # Hand over the pixels without copying
+                frames += 1
+    finally:
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+
+    elapsed = time.perf_counter() - start
+    duration = frames / fps
+    print(f"{frames} frames ({duration:.1f}s of video) in {elapsed:.1f}s, "
+          f"{duration / elapsed if elapsed else 0:.1f}x real time", file=sys.stderr)
+    return 0 if encoder is None or encoder.returncode == 0 else encoder.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an mQIX replay to video")
+    parser.add_argument("replay", help="replay recorded with mqix.py --record")
+    parser.add_argument("output", help="video file, or - for raw frames on stdout")
+    parser.add_argument("--fps", type=int, default=50, help="output frame rate (default 50)")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="encoder binary (default ffmpeg)")
+    args = parser.parse_args()
+    return export(args.replay, args.output, args.fps, args.ffmpeg)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
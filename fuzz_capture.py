@@ -0,0 +1,352 @@
+"""
+Differential fuzzing of territory capture engines.
+
+Random valid trails are played on random field sizes through the reference
+capture algorithm and through a candidate engine, and the resulting grids,
+perimeters, created borders and percentages are compared tile by tile.
+Failing cases are shrunk to a minimal trail before being reported.
+
+    python fuzz_capture.py --cases 500 --engine Field:Field
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Runs headlessly
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import importlib
+import json
+import math
+import random
+import statistics
+import sys
+import time
+
+from utils import Tile, Wire
+
+NEIGHBOURS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+
+class ReferenceField:
+    """The original capture algorithm, kept frozen as the source of truth"""
+
+    def __init__(self, x, y, width=160, height=120):
+        self.width = width
+        self.height = height
+        self.created_borders = set()
+        self.tiles = [[Tile(x_pos, y_pos) for x_pos in range(width)] for y_pos in range(height)]
+        self.perimeter = set()
+        self.wires = []
+        self.wire_coordinates = []
+        for y_pos in range(height):
+            for x_pos in range(width):
+                if x_pos in (0, width - 1) or y_pos in (0, height - 1):
+                    self.tiles[y_pos][x_pos].is_border = True
+                    self.tiles[y_pos][x_pos].capture()
+        self.update_perimeter()
+
+    def is_captured(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.tiles[y][x].captured
+        return True
+
+    def update_perimeter(self):
+        self.perimeter = set()
+        for y in range(self.height):
+            for x in range(self.width):
+                if self.is_captured(x, y) or (x, y) in self.created_borders:
+                    for dy, dx in [(0,1),(1,0),(0,-1),(-1,0)]:
+                        nx, ny = x + dx, y + dy
+                        if (0 <= nx < self.width and 0 <= ny < self.height and
+                            not self.is_captured(nx, ny) and
+                            (nx, ny) not in self.created_borders):
+                            self.perimeter.add((x, y))
+                            break
+
+    def push(self, x, y):
+        if (0 <= x < self.width and 0 <= y < self.height and
+            not self.tiles[y][x].is_border):
+            if (x, y) not in self.wire_coordinates:
+                self.wires.append(Wire(x, y))
+                self.wire_coordinates.append((x, y))
+                self.tiles[y][x].is_wire = True
+
+    def capture_area(self):
+        if len(self.wires) < 2:
+            self.wires = []
+            self.wire_coordinates = []
+            return
+
+        capture_trail = set(self.wire_coordinates)
+        for wire in self.wires:
+            if 0 <= wire.x < self.width and 0 <= wire.y < self.height:
+                self.tiles[wire.y][wire.x].capture()
+                self.tiles[wire.y][wire.x].is_wire = False
+
+        direction = (self.wires[0].x - self.wires[1].x, self.wires[0].y - self.wires[1].y)
+        temp_left = [[self.is_captured(x, y) for x in range(self.width)] for y in range(self.height)]
+        temp_right = [[self.is_captured(x, y) for x in range(self.width)] for y in range(self.height)]
+
+        if direction[0]:
+            self.flood_fill(temp_left, self.wires[1].x, self.wires[1].y + 1)
+            self.flood_fill(temp_right, self.wires[1].x, self.wires[1].y - 1)
+        else:
+            self.flood_fill(temp_left, self.wires[1].x + 1, self.wires[1].y)
+            self.flood_fill(temp_right, self.wires[1].x - 1, self.wires[1].y)
+
+        left_count = sum(sum(row) for row in temp_left)
+        right_count = sum(sum(row) for row in temp_right)
+        target = temp_left if left_count < right_count else temp_right
+
+        for y in range(self.height):
+            for x in range(self.width):
+                if target[y][x]:
+                    self.tiles[y][x].capture()
+
+        for x, y in capture_trail:
+            if not self.tiles[y][x].is_border and self.tiles[y][x].captured:
+                self.tiles[y][x].is_border = True
+                self.created_borders.add((x, y))
+        self.wires = []
+        self.wire_coordinates = []
+        self.update_perimeter()
+
+    def flood_fill(self, matrix, x, y):
+        stack = [(x, y)]
+        while stack:
+            x, y = stack.pop()
+            if (0 <= x < self.width and 0 <= y < self.height and
+                not matrix[y][x]):
+                matrix[y][x] = True
+                stack.append((x + 1, y))
+                stack.append((x - 1, y))
+                stack.append((x, y + 1))
+                stack.append((x, y - 1))
+
+    def capture_percentage(self):
+        total_capturable = 0
+        captured = 0
+        for y in range(self.height):
+            for x in range(self.width):
+                if not self.tiles[y][x].is_border:
+                    total_capturable += 1
+                    if self.is_captured(x, y):
+                        captured += 1
+        if total_capturable == 0:
+            return 0
+        return math.floor((captured / total_capturable) * 100)
+
+
+def load_engine(spec):
+    """Import an engine class from a 'module:Class' spec"""
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name or "Field")
+
+
+def is_valid_trail(field, trail):
+    """Check that the player could walk this trail from border to border"""
+    if not trail or len(set(trail)) != len(trail):
+        return False
+    for i, (x, y) in enumerate(trail):
+        if not (0 <= x < field.width and 0 <= y < field.height) or field.is_captured(x, y):
+            return False
+        if i and abs(x - trail[i - 1][0]) + abs(y - trail[i - 1][1]) != 1:
+            return False
+    return touches_border(field, trail[0]) and touches_border(field, trail[-1])
+
+
+def touches_border(field, pos):
+    x, y = pos
+    return any(0 <= x + dx < field.width and 0 <= y + dy < field.height and
+               field.tiles[y + dy][x + dx].is_border for dx, dy in NEIGHBOURS)
+
+
+def random_trail(field, rng, max_length):
+    """Random self-avoiding walk through uncaptured tiles, border to border"""
+    starts = sorted(pos for pos in field.perimeter if field.tiles[pos[1]][pos[0]].is_border)
+    if not starts:
+        return None
+    x, y = rng.choice(starts)
+    target_length = rng.randint(1, max_length)
+    trail = []
+    seen = set()
+    while True:
+        options = [(x + dx, y + dy) for dx, dy in NEIGHBOURS
+                   if (x + dx, y + dy) not in seen and not field.is_captured(x + dx, y + dy)]
+        if trail and touches_border(field, trail[-1]) and (len(trail) >= target_length or not options):
+            return trail
+        if not options:
+            return None  # Walked into a dead end
+        x, y = rng.choice(options)
+        trail.append((x, y))
+        seen.add((x, y))
+
+
+def play(engine_cls, case):
+    """Run a case through an engine, returning (field, seconds spent capturing)"""
+    field = engine_cls(0, 0, case["width"], case["height"])
+    start = time.perf_counter()
+    for trail in case["trails"]:
+        for x, y in trail:
+            field.push(x, y)
+        field.capture_area()
+    return field, time.perf_counter() - start
+
+
+def is_valid_case(case):
+    """Replay a case on the reference and check every trail is still walkable"""
+    if case["width"] < 3 or case["height"] < 3:
+        return False
+    field = ReferenceField(0, 0, case["width"], case["height"])
+    for trail in case["trails"]:
+        if not is_valid_trail(field, trail):
+            return False
+        for x, y in trail:
+            field.push(x, y)
+        field.capture_area()
+    return True
+
+
+def compare(reference, candidate):
+    """Return a description of the first difference, or None"""
+    for y in range(reference.height):
+        for x in range(reference.width):
+            expected = reference.tiles[y][x]
+            actual = candidate.tiles[y][x]
+            for attr in ("captured", "is_border", "is_wire"):
+                if getattr(expected, attr) != getattr(actual, attr):
+                    return f"tile ({x}, {y}) {attr}: expected {getattr(expected, attr)}, got {getattr(actual, attr)}"
+    if set(reference.perimeter) != set(candidate.perimeter):
+        diff = sorted(set(reference.perimeter) ^ set(candidate.perimeter))
+        return f"perimeter differs at {diff[:5]}"
+    if set(reference.created_borders) != set(candidate.created_borders):
+        diff = sorted(set(reference.created_borders) ^ set(candidate.created_borders))
+        return f"created_borders differs at {diff[:5]}"
+    if reference.capture_percentage() != candidate.capture_percentage():
+        return (f"capture_percentage: expected {reference.capture_percentage()}, "
+                f"got {candidate.capture_percentage()}")
+    return None
+
+
+def check(engine_cls, case):
+    """Return (difference or None, reference seconds, candidate seconds)"""
+    reference, reference_time = play(ReferenceField, case)
+    try:
+        candidate, candidate_time = play(engine_cls, case)
+    except Exception as error:
+        return f"candidate raised {error!r}", reference_time, 0.0
+    return compare(reference, candidate), reference_time, candidate_time
+
+
+def random_case(rng, min_size, max_size, max_trails):
+    width = rng.randint(min_size, max_size)
+    height = rng.randint(min_size, max_size)
+    field = ReferenceField(0, 0, width, height)
+    trails = []
+    for _ in range(rng.randint(1, max_trails)):
+        trail = None
+        for _ in range(20):
+            trail = random_trail(field, rng, max_length=width + height)
+            if trail:
+                break
+        if not trail:
+            break
+        for x, y in trail:
+            field.push(x, y)
+        field.capture_area()
+        trails.append(trail)
+    return {"width": width, "height": height, "trails": trails}
+
+
+def shrink_candidates(case):
+    """Smaller variants of a case, most aggressive first"""
+    trails = case["trails"]
+    for i in range(len(trails)):
+        yield dict(case, trails=trails[:i] + trails[i + 1:])
+    for i, trail in enumerate(trails):
+        # Cut out loops where the trail passes next to itself
+        for start in range(len(trail)):
+            for end in range(len(trail) - 1, start + 1, -1):
+                (x1, y1), (x2, y2) = trail[start], trail[end]
+                if abs(x1 - x2) + abs(y1 - y2) == 1:
+                    shorter = trail[:start + 1] + trail[end:]
+                    yield dict(case, trails=trails[:i] + [shorter] + trails[i + 1:])
+        chunk = len(trail) // 2
+        while chunk >= 1:
+            for start in range(0, len(trail) - chunk + 1):
+                shorter = trail[:start] + trail[start + chunk:]
+                yield dict(case, trails=trails[:i] + [shorter] + trails[i + 1:])
+            chunk //= 2
+    used = [pos for trail in trails for pos in trail]
+    if all(x < case["width"] - 2 for x, _ in used):
+        yield dict(case, width=case["width"] - 1)
+    if all(y < case["height"] - 2 for _, y in used):
+        yield dict(case, height=case["height"] - 1)
+
+
+def shrink(engine_cls, case):
+    """Greedily shrink a failing case while it stays valid and failing"""
+    changed = True
+    while changed:
+        changed = False
+        for smaller in shrink_candidates(case):
+            if is_valid_case(smaller) and check(engine_cls, smaller)[0]:
+                case = smaller
+                changed = True
+                break
+    return case
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential fuzzing of capture engines")
+    parser.add_argument("--engine", default="Field:Field",
+                        help="candidate engine as module:Class (default Field:Field)")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--min-size", type=int, default=5)
+    parser.add_argument("--max-size", type=int, default=60)
+    parser.add_argument("--max-trails", type=int, default=6)
+    parser.add_argument("--report", metavar="PATH",
+                        help="also write one JSON line per case (size, trails, timings, speedup)")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    engine_cls = load_engine(args.engine)
+    speedups = []
+    failures = 0
+    report = open(args.report, "w") if args.report else None
+
+    for number in range(args.cases):
+        case = random_case(rng, args.min_size, args.max_size, args.max_trails)
+        difference, reference_time, candidate_time = check(engine_cls, case)
+        speedup = reference_time / candidate_time if candidate_time else None
+        if speedup is not None:
+            speedups.append(speedup)
+        size = f"{case['width']}x{case['height']}"
+        trails = len(case["trails"])
+        print(f"case {number}: {size}, {trails} trail{'' if trails == 1 else 's'}, "
+              + (f"{speedup:.2f}x" if speedup is not None else "no timing"))
+        if report:
+            report.write(json.dumps({
+                "case": number, "width": case["width"], "height": case["height"],
+                "trails": trails, "reference_ms": reference_time * 1000,
+                "candidate_ms": candidate_time * 1000, "speedup": speedup,
+                "match": not difference}) + "\n")
+        if difference:
+            failures += 1
+            minimal = shrink(engine_cls, case)
+            print(f"case {number}: {difference}")
+            print(f"  minimal case: {check(engine_cls, minimal)[0]}")
+            print("  " + json.dumps(minimal))
+
+    if report:
+        report.close()
+    print(f"seed {seed}: {args.cases - failures}/{args.cases} cases match the reference")
+    if speedups:
+        print(f"speedup vs reference: median {statistics.median(speedups):.2f}x, "
+              f"min {min(speedups):.2f}x, max {max(speedups):.2f}x")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,18 @@
+import time
+START_TIME = time.perf_counter()  # Reference point for the time-to-first-frame report
+
 import pygame
-from Player import Player
+from Player import Player, RemoteKeys
 import Enemies
-from Field import Field
-import math
+from Field import Field, TILE_SIZE
+import argparse
+import functools
+import sys
 from utils import *
-
-# Initialize Pygame
-pygame.init()
+from History import History
 
 # Screen dimensions - increased to fit 800x600 field + UI
 SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 700
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("mQIX")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -19,164 +20,354 @@ BLUE = (50, 50, 200)
 BLACK = (0, 0, 0)
 GREEN = (100, 255, 100)
 
-# Fonts
-font = pygame.font.SysFont("arialblack", 40)
+TITLE_FONT = ("arialblack", 40)
+START_BUTTON_IMAGE = "images/play-button.jpg"
+
+# Rewind history for practice mode
+REWIND_TICKS = 100  # One second at 100 FPS
+
+# Collision reach in tiles around the player's tile (close to the old pixel distances)
+SPARC_HIT_RADIUS = 2
+QIX_HIT_RADIUS = 4
+
+# (label, seconds since START_TIME) for the startup report
+startup_marks = []
 
-# Load button image
-startbuttonimg = pygame.image.load("images/play-button.jpg").convert_alpha()
-startButton = Button(SCREEN_WIDTH//2 - 75, SCREEN_HEIGHT//2, startbuttonimg, 0.25)
+def mark(label):
+    startup_marks.append((label, time.perf_counter() - START_TIME))
 
-game_field = Field(
-    x=(SCREEN_WIDTH - 800) // 2,  # Still ~800px wide (160 tiles * 5px)
-    y=50,
-    width=160,  # 160 tiles
-    height=120  # 120 tiles
-)
-# Create the Player object
-player = Player(game_field)
+def startup_report():
+    """Time-to-first-frame breakdown, one line per startup phase"""
+    lines = []
+    previous = 0.0
+    for label, at in startup_marks:
+        lines.append(f"  {label:<22}{(at - previous) * 1000:8.1f} ms")
+        previous = at
+    lines.append(f"  {'time to first frame':<22}{previous * 1000:8.1f} ms")
+    return "\n".join(lines)
 
-# Create the Sparc (enemy) object
-sparc = Enemies.Sparc(game_field)
-sparc2 = Enemies.Sparc(game_field)
-sparc2.reverse_direction()
+@functools.lru_cache(maxsize=None)
+def get_font(name, size):
+    """Load a font once; name None is pygame's bundled font (no system font scan)"""
+    if name is None:
+        return pygame.font.Font(None, size)
+    return pygame.font.SysFont(name, size)
 
-qix = Enemies.Qix(game_field, size=12)
+@functools.lru_cache(maxsize=None)
+def get_image(path):
+    """Load an image once"""
+    return pygame.image.load(path).convert_alpha()
 
-# Game state
-game_started = False  
-game_over = False
-capture_percentage = 0  # Initialize capture percentage
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="mQIX")
+    parser.add_argument("--serve", metavar="HOST:PORT",
+                        help="Stream the game state to spectators on this address")
+    parser.add_argument("--two-player", action="store_true",
+                        help="Let the first client that sends input play a second player (needs --serve)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Record a replay for export_video.py")
+    parser.add_argument("--level", metavar="PATH",
+                        help="Play a level compiled with Level.py")
+    parser.add_argument("--practice", action="store_true",
+                        help="Practice mode: Backspace rewinds one second")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="Append gameplay analytics to this JSONL file")
+    parser.add_argument("--ttff", action="store_true",
+                        help="Print the time-to-first-frame report and exit")
+    args = parser.parse_args(argv)
+    if args.two_player and not args.serve:
+        parser.error("--two-player needs --serve")
+    return args
 
-def draw_menu():
+def new_field(level=None):
+    """Build the playing field, centred horizontally"""
+    if level is not None:
+        return Field(x=(SCREEN_WIDTH - level.width * TILE_SIZE) // 2, y=50, level=level)
+    return Field(
+        x=(SCREEN_WIDTH - 800) // 2,  # Still ~800px wide (160 tiles * 5px)
+        y=50,
+        width=160,  # 160 tiles
+        height=120  # 120 tiles
+    )
+
+class Round:
+    def __init__(self, level=None, two_player=False, practice=False):
+        """Field, entities and (in practice mode) rewind history for one game"""
+        self.field = new_field(level)
+        # Create the Player object
+        self.player = Player(self.field)
+        self.players = [self.player]
+        self.player2 = None
+        if two_player:
+            # The remote player starts on the top border
+            self.player2 = Player(self.field, color=(0, 120, 255), start_edge="top")
+            self.players.append(self.player2)
+        # Create the Sparc (enemy) objects
+        self.sparc = Enemies.Sparc(self.field)
+        self.sparc2 = Enemies.Sparc(self.field)
+        self.sparc2.reverse_direction()
+        self.sparcs = [self.sparc, self.sparc2]
+        self.qix = Enemies.Qix(self.field, size=12)
+        self.history = None
+        if practice:
+            self.history = History(self.field, self.players + [self.sparc, self.sparc2, self.qix])
+
+def draw_menu(screen, start_button, title_font):
     screen.fill(WHITE)
-    title_text = font.render("mQIX", True, BLACK)
+    title_text = title_font.render("mQIX", True, BLACK)
     screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 100))
-    
-    if startButton.draw(screen):  
+
+    if start_button.draw(screen):
         return True  # Button clicked
-    
+
     pygame.display.flip()
     return False
 
-def render_game():
+def render_game(screen, game, capture_percentage, game_over):
     """Render all game elements"""
     # Clear screen
     screen.fill(WHITE)
-    
+
     # Draw the field with captured areas and wires
-    game_field.draw(screen)
-    
-    # Draw player and enemy
-    player.draw(screen)
-    sparc.draw(screen)
-    sparc2.draw(screen)
-    qix.draw(screen)
+    game.field.draw(screen)
+
+    # Draw players and enemies
+    for player in game.players:
+        player.draw(screen)
+    for sparc in game.sparcs:
+        sparc.draw(screen)
+    game.qix.draw(screen)
     # Draw UI elements
-    player.draw_health_bar(screen, SCREEN_HEIGHT)
-    
+    game.player.draw_health_bar(screen, SCREEN_HEIGHT)
+    if game.player2:
+        game.player2.draw_health_bar(screen, SCREEN_HEIGHT, SCREEN_WIDTH - 220)
+
     # Display capture percentage
-    font_small = pygame.font.SysFont(None, 36)
+    font_small = get_font(None, 36)
     capture_text = font_small.render(f"Captured: {int(capture_percentage)}%", True, BLACK)
     screen.blit(capture_text, (20, 20))
-    
+
     # Game over message
     if game_over:
-        font_large = pygame.font.SysFont(None, 72)
-        if player.health <= 0:
+        font_large = get_font(None, 72)
+        if all(player.health <= 0 for player in game.players):
             text = font_large.render("GAME OVER", True, (255, 0, 0))
         else:
             text = font_large.render("YOU WIN!", True, (0, 255, 0))
         text_rect = text.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT/2))
         screen.blit(text, text_rect)
-        
+
         restart_text = font_large.render("Press R to restart", True, BLACK)
         restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT/2 + 50))
         screen.blit(restart_text, restart_rect)
 
-# Main game loop
-running = True
-clock = pygame.time.Clock()
-
-while running:
-    # print(game_field.capture_percentage())
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            if game_over and event.key == pygame.K_r:
-                # Reset game state
-                game_field = Field(
-                    x=(SCREEN_WIDTH - 800) // 2,  # Still ~800px wide (160 tiles * 5px)
-                    y=50,
-                    width=160,  # 160 tiles
-                    height=120  # 120 tiles
-                )
-                player = Player(game_field)
-                sparc = Enemies.Sparc(game_field)
-                sparc2 = Enemies.Sparc(game_field)
-                game_over = False
-                capture_percentage = 0
-    
-    # Get current key states
-    keys = pygame.key.get_pressed()
-    
-    if not game_started:
-        game_started = draw_menu()
-    else:
-        if not game_over:
-            # Handle game logic
-            player.move(keys)
-            sparc.move()
-            sparc2.move()
-            qix.move()
-            
-            # Check for player-Sparc collisions
-            for enemy in [sparc, sparc2]:
-                # Simple distance-based collision detection
-                distance = math.sqrt((player.position[0] - enemy.position[0])**2 + 
-                                   (player.position[1] - enemy.position[1])**2)
-                collision_threshold = player.size + enemy.size  # Sum of their sizes
-                
-                if distance < collision_threshold:
-                    enemy.reverse_direction()
-                    player.health -= 10  # Deduct health
-                    # print(f"Player hit! Health now: {player.health}")
-                    
-                    # Optional: Add visual feedback
-                    pygame.time.set_timer(pygame.USEREVENT, 200)  # Reset color after 200ms
-                    
-            
-            qix_distance = math.sqrt((player.position[0] - qix.position[0])**2 + 
-                                   (player.position[1] - qix.position[1])**2)
-            qix_collision_threshold = player.size + qix.size  
-            if qix_distance < qix_collision_threshold:
-                qix.reset_to_uncaptured_area()
-                player.health -= 25
-                pygame.time.set_timer(pygame.USEREVENT, 200)
-
-            # Sum of their sizes
-            # Handle the color reset event
-            for event in pygame.event.get():
-                if event.type == pygame.USEREVENT:
-                    player.color = (0, 255, 0)  # Reset to green
-                    pygame.time.set_timer(pygame.USEREVENT, 0)  # Cancel the timer
-            
-            # Update game state
-            if player.health <= 0:
-                game_over = True
-            
-            # Calculate capture percentage using Field's method
-            capture_percentage = game_field.capture_percentage()
-            
-            # Check win condition
-            if capture_percentage >= 80:
-                game_over = True
-        
-        # Render everything
-        render_game()
-    # Update display
-    pygame.display.flip()
-    clock.tick(100)
-        
-pygame.quit()
\ No newline at end of file
+async def game_loop(screen, start_button, level=None, state_server=None, recorder=None,
+                    telemetry=None, two_player=False, practice=False):
+    """Run one frame per iteration, yielding to background tasks in between"""
+    import asyncio
+    from Scheduler import FrameScheduler
+    scheduler = FrameScheduler(fps=100)
+    # The system font scan and the first Field are built while the menu shows
+    title_font_ready = scheduler.run_in_executor(get_font, *TITLE_FONT)
+    next_game = scheduler.run_in_executor(Round, level, two_player, practice)
+    if state_server or recorder:
+        from Network import entity_states
+    if telemetry:
+        from Telemetry import HIT_SPARC, HIT_QIX
+
+    def start_round(game):
+        if telemetry:
+            telemetry.flush(scheduler)  # Pending records belong to the round that ended
+            telemetry.new_round()
+            game.field.on_capture = telemetry.capture
+        return game
+
+    game = None
+    game_started = False
+    game_over = False
+    capture_percentage = 0
+    running = True
+
+    while running:
+        # print(game.field.capture_percentage())
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if game_over and event.key == pygame.K_r:
+                    # Reset game state
+                    game = start_round(Round(level, two_player, practice))
+                    game_over = False
+                    capture_percentage = 0
+                elif (practice and game_started and not game_over and
+                      event.key == pygame.K_BACKSPACE):
+                    # Jump back a second
+                    game.history.rewind(REWIND_TICKS)
+
+        # Get current key states
+        keys = pygame.key.get_pressed()
+
+        if not game_started:
+            # Until the system font scan finishes, the title uses the bundled font
+            if title_font_ready.done() and not title_font_ready.exception():
+                title_font = title_font_ready.result()
+            else:
+                title_font = get_font(None, 48)
+            game_started = draw_menu(screen, start_button, title_font)
+            if game_started:
+                game = start_round(await next_game)  # Usually finished long before the click
+        else:
+            player, qix = game.player, game.qix
+            if not game_over:
+                # Handle game logic
+                if player.health > 0:
+                    player.move(keys, scheduler.dt)  # Seconds since last frame
+                if (game.player2 and game.player2.health > 0 and
+                        state_server.player_client is not None):
+                    # Keys reported by the remote client over the state stream
+                    game.player2.move(RemoteKeys(state_server.remote_input()), scheduler.dt)
+                for sparc in game.sparcs:
+                    sparc.move()
+                qix.move()
+
+                # Hazards are occupancy lookups around each player's tile
+                field = game.field
+                for target in game.players:
+                    if target.health <= 0:
+                        continue
+                    player_x, player_y = target.field_x, target.field_y
+                    for enemy in field.occupants_near(player_x, player_y, SPARC_HIT_RADIUS):
+                        if isinstance(enemy, Enemies.Sparc):
+                            enemy.reverse_direction()
+                            target.health -= 10  # Deduct health
+                            if telemetry:
+                                telemetry.hit(HIT_SPARC, player_x, player_y, 10)
+
+                            # Optional: Add visual feedback
+                            pygame.time.set_timer(pygame.USEREVENT, 200)  # Reset color after 200ms
+
+                    # A Qix hits when it reaches the player or touches the player's active wire
+                    qix_hits = {enemy for enemy in field.occupants_near(player_x, player_y, QIX_HIT_RADIUS)
+                                if isinstance(enemy, Enemies.Qix)}
+                    if target.capturing:
+                        for enemy in field.qixes:
+                            qix_x, qix_y = field.entity_tiles[enemy]
+                            if field.tiles[qix_y][qix_x].is_wire:
+                                qix_hits.add(enemy)
+                    for enemy in qix_hits:
+                        enemy.reset_to_uncaptured_area()
+                        target.health -= 25
+                        if telemetry:
+                            telemetry.hit(HIT_QIX, player_x, player_y, 25)
+                        pygame.time.set_timer(pygame.USEREVENT, 200)
+
+                # A dead or disconnected player's unfinished trail would lock the other out
+                for target in game.players:
+                    if target.health <= 0 or (target is game.player2 and
+                                              state_server.player_client is None):
+                        target.drop_trail()
+
+                # Handle the color reset event
+                for event in pygame.event.get():
+                    if event.type == pygame.USEREVENT:
+                        player.color = (0, 255, 0)  # Reset to green
+                        pygame.time.set_timer(pygame.USEREVENT, 0)  # Cancel the timer
+
+                # Update game state
+                if all(target.health <= 0 for target in game.players):
+                    game_over = True
+
+                # Calculate capture percentage using Field's method
+                capture_percentage = game.field.capture_percentage()
+
+                # Check win condition
+                if capture_percentage >= 80:
+                    game_over = True
+
+                if telemetry:
+                    telemetry.percentage(capture_percentage)
+                    # Flush in batches off the game thread: at round end or once a ring fills up
+                    if game_over or telemetry.needs_flush():
+                        telemetry.flush(scheduler)
+
+            # Record this tick's tile changes and send them to spectators
+            tile_changes = game.field.end_tick()
+            if game.history is not None:
+                game.history.record(tile_changes)
+            if state_server or recorder:
+                entities = entity_states(game.players, game.sparcs, [qix])
+                hud = (player.health, game.player2.health if game.player2 else None,
+                       capture_percentage)
+                if state_server:
+                    state_server.broadcast(game.field, tile_changes, entities, hud, scheduler.dt)
+                if recorder:
+                    recorder.record(game.field, tile_changes, entities, hud, scheduler.dt)
+
+            # Render everything
+            render_game(screen, game, capture_percentage, game_over)
+        # Update display
+        pygame.display.flip()
+        # Deferred work fills what is left of the frame, then yield to background tasks
+        await scheduler.next_frame()
+
+    await asyncio.gather(title_font_ready, next_game, return_exceptions=True)
+    if telemetry:
+        telemetry.flush(scheduler)  # Written out by scheduler.close()
+    await scheduler.close()
+
+def main(argv=None):
+    mark("imports")
+    args = parse_args(argv)
+
+    # Only the subsystems the game uses (no audio or joystick)
+    pygame.display.init()
+    pygame.font.init()
+    mark("pygame init")
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("mQIX")
+    mark("display")
+
+    # Show the menu before loading anything the menu does not need
+    start_button = Button(SCREEN_WIDTH//2 - 75, SCREEN_HEIGHT//2, get_image(START_BUTTON_IMAGE), 0.25)
+    draw_menu(screen, start_button, get_font(None, 48))  # Flips the display
+    mark("first frame")
+    if args.ttff:
+        print(startup_report())
+        pygame.quit()
+        return 0
+
+    level = None
+    if args.level:
+        from Level import load_level
+        level = load_level(args.level)
+
+    # Optional spectator (and second player) stream and replay recording
+    state_server = None
+    recorder = None
+    if args.serve:
+        from Network import StateServer
+        host, _, port = args.serve.rpartition(":")
+        state_server = StateServer(host or "127.0.0.1", int(port))
+        print(f"Streaming game state on {state_server.address[0]}:{state_server.address[1]}")
+    if args.record:
+        from Network import StateRecorder
+        recorder = StateRecorder(args.record)
+    telemetry = None
+    if args.telemetry:
+        from Telemetry import Telemetry
+        telemetry = Telemetry(args.telemetry)
+
+    import asyncio  # Deferred until after the first frame
+    try:
+        asyncio.run(game_loop(screen, start_button, level, state_server, recorder,
+                              telemetry, args.two_player, args.practice))
+    finally:
+        if state_server:
+            state_server.close()
+        if recorder:
+            recorder.close()
+        pygame.quit()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Watch a game streamed with `python mqix.py --serve`, or join it as the
+second player when the host also passed --two-player:
+
+    python mqix.py --serve 0.0.0.0:7406 --two-player
+    python spectate.py 192.168.0.10:7406 --play
+"""
+import argparse
+import sys
+
+import pygame
+
+from Network import StateClient
+from Player import key_mask
+from ReplayRenderer import ReplayRenderer, SCREEN_WIDTH, SCREEN_HEIGHT
+
+FPS = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch or join a streamed mQIX game")
+    parser.add_argument("address", help="HOST:PORT given to mqix.py --serve")
+    parser.add_argument("--play", action="store_true",
+                        help="control the second player with the arrow keys and Shift")
+    args = parser.parse_args()
+    host, _, port = args.address.rpartition(":")
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("mQIX - player 2" if args.play else "mQIX - spectating")
+    renderer = ReplayRenderer()
+    client = StateClient(host or "127.0.0.1", int(port))
+    clock = pygame.time.Clock()
+
+    try:
+        running = True
+        while running and client.connected:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+            client.poll()
+            if args.play:
+                client.send_input(key_mask(pygame.key.get_pressed()))
+            if client.decoder.synced:
+                screen.blit(renderer.render(client.decoder), (0, 0))
+                pygame.display.flip()
+            clock.tick(FPS)
+    finally:
+        client.close()
+        pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
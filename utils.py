@@ -23,6 +23,20 @@ class Button():
         surface.blit(self.image, (self.rect.x, self.rect.y))
         return action
 
+def draw_health_bar(surface, health, max_health, screen_height=400, bar_x=20):
+    """Draw the health bar along the bottom of the screen (bottom-left by default)"""
+    bar_width = 200
+    bar_height = 20
+    bar_y = screen_height - 40
+
+    # Black outline
+    pygame.draw.rect(surface, (0, 0, 0), (bar_x-2, bar_y-2, bar_width+4, bar_height+4))
+    # Background
+    pygame.draw.rect(surface, (200, 0, 0), (bar_x, bar_y, bar_width, bar_height))
+    # Health
+    fill_width = max(0, health / max_health) * bar_width
+    pygame.draw.rect(surface, (0, 255, 0), (bar_x, bar_y, fill_width, bar_height))
+
 class Tile:
     def __init__(self, x, y):
         self.x = x